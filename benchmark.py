@@ -0,0 +1,316 @@
+"""
+Benchmarks that drive the real pipeline stages (no camera needed).
+
+Per-stage throughput (default suite), on synthetic scenes or a recorded video / image folder:
+
+    python benchmark.py --resolutions 1280x720 1920x1080 --frames 200
+    python benchmark.py --source recording.mp4 --json results.json
+
+Reports p50/p95/p99 and fps of StateManager._preprocess, StateManager.detect_changes (contours),
+StateManager.detect_blobs (connected components), ZoneManager.check_intersection (per blob),
+ZoneManager.zones_at (vectorized, per centroid), ZoneManager.blobs_zone_pixels (the
+pipeline's hit test), UIRenderer.draw_video (crop + scale into the dashboard),
+UIRenderer.draw_zones_on_video (at display resolution) and UIRenderer.render.
+'pipeline' is the sum of the stages the dashboard loop runs (detect_blobs, blobs_zone_pixels,
+draw_video, draw_zones_on_video, render).
+
+Detection downscale accuracy:
+
+    python benchmark.py --suite downscale --resolutions 1280x720 1920x1080 --downscales 1 2 4
+
+Reports time per frame of StateManager.detect_blobs at each detection downscale,
+and how well the detected blobs match the ground truth (recall, false positives,
+centroid error in camera pixels).
+
+Per-frame memory allocation of the dashboard loop, with and without the buffer pool:
+
+    python benchmark.py --suite memory --resolutions 1280x720 1920x1080
+
+Runs draw_video, detect_blobs, blobs_zone_pixels, draw_zones_on_video, draw_blobs and render
+under tracemalloc (NumPy and OpenCV outputs are traced) and reports, per frame, the peak
+memory allocated above what was held before the frame, and what the frame left allocated.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.camera_manager import CameraManager
+from src.frame_sources import SyntheticSource
+from src.log_manager import LogManager
+from src.state_manager import StateManager
+from src.synthetic_scene import SyntheticScene
+from src.zone_manager import ZoneManager
+
+STAGES = ("_preprocess", "detect_changes", "detect_blobs", "check_intersection", "zones_at", "blobs_zone_pixels",
+          "draw_video", "draw_zones_on_video", "render")
+PIPELINE_STAGES = ("detect_blobs", "blobs_zone_pixels", "draw_video", "draw_zones_on_video", "render")
+
+def parse_resolution(value):
+    w, h = value.lower().split("x")
+    return int(w), int(h)
+
+def match_blobs(centroids, truth):
+    """Returns (matched, false_positives, centroid_errors) for one frame ((N, 2) detection centroids)."""
+    if len(centroids) == 0:
+        return 0, 0, []
+
+    # A blob is found if some detection centroid lies within its radius
+    dist = np.linalg.norm(truth[:, None, :2] - centroids[None, :, :], axis=2)
+    nearest = dist.argmin(axis=1)
+    found = dist[np.arange(len(truth)), nearest] <= truth[:, 2]
+    used = set(nearest[found].tolist())
+    errors = dist[np.arange(len(truth)), nearest][found].tolist()
+    return int(found.sum()), len(centroids) - len(used), errors
+
+def bench_downscale(resolution, downscale, frames, blobs, seed):
+    w, h = resolution
+    scene = SyntheticScene(w, h, blobs=blobs, seed=seed)
+    state = StateManager()
+    state.detection_downscale = downscale
+    state.set_hot(scene.reference_frame())
+
+    times = []
+    matched = total = false_pos = 0
+    errors = []
+    for _ in range(frames):
+        frame, truth = scene.next_frame()
+        t0 = time.perf_counter()
+        blobs = state.detect_blobs(frame)
+        times.append(time.perf_counter() - t0)
+
+        m, fp, err = match_blobs(blobs.centroids, truth)
+        matched += m
+        total += len(truth)
+        false_pos += fp
+        errors.extend(err)
+
+    times = np.array(times) * 1000
+    return {
+        'ms_p50': float(np.percentile(times, 50)),
+        'ms_p95': float(np.percentile(times, 95)),
+        'fps': 1000.0 / float(times.mean()),
+        'recall': matched / total if total else 0.0,
+        'false_pos': false_pos / frames,
+        'centroid_err': float(np.mean(errors)) if errors else float('nan'),
+    }
+
+def summarize(times_ms):
+    times_ms = np.asarray(times_ms)
+    return {
+        'ms_p50': float(np.percentile(times_ms, 50)),
+        'ms_p95': float(np.percentile(times_ms, 95)),
+        'ms_p99': float(np.percentile(times_ms, 99)),
+        'fps': 1000.0 / float(times_ms.mean()) if times_ms.mean() > 0 else float('inf'),
+    }
+
+def make_zones(zone_manager, width, height, count, seed):
+    """Random convex quads covering roughly a quarter of the frame each."""
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        cx, cy = rng.uniform(0.2, 0.8) * width, rng.uniform(0.2, 0.8) * height
+        rx, ry = width * 0.15, height * 0.15
+        for angle in np.sort(rng.uniform(0, 2 * np.pi, size=4)):
+            zone_manager.add_point(int(np.clip(cx + rx * np.cos(angle), 0, width - 1)),
+                                   int(np.clip(cy + ry * np.sin(angle), 0, height - 1)))
+        zone_manager.close_zone()
+
+def open_bench_source(source):
+    """Camera on 'source' and its first frame (the reference to arm on)."""
+    camera = CameraManager(source, loop=True, realtime=False)
+    if isinstance(camera.cap, SyntheticSource):
+        camera.cap.warmup = 1 # One empty frame to arm on, then blobs from the first measured frame
+    reference = camera.read_frame()
+    if reference is None:
+        camera.release()
+        raise RuntimeError(f"Could not read from source {source}")
+    return camera, reference
+
+def bench_stages(source, frames, warmup, zones, seed):
+    """Times each pipeline stage over 'frames' frames of 'source'. Returns {stage: summary}."""
+    from src.ui_renderer import UIRenderer
+
+    camera, reference = open_bench_source(source)
+    h, w = reference.shape[:2]
+
+    state = StateManager()
+    state.set_hot(reference)
+    zone_manager = ZoneManager()
+    make_zones(zone_manager, w, h, zones, seed)
+    zone_manager.ensure_raster(w, h)
+    renderer = UIRenderer()
+    log_manager = LogManager()
+    canvas = np.zeros((720, 1270, 3), dtype=np.uint8)
+    metrics = {'fps': 0.0, 'latency': 0.0, 'proc': 'CPU'}
+
+    times = {stage: [] for stage in STAGES}
+    total = []
+    # Static background: detect_changes and detect_blobs can share the state without affecting each other
+    for i in range(warmup + frames):
+        frame = camera.read_frame()
+        if frame is None:
+            break
+        timed = i >= warmup
+        t = [time.perf_counter()]
+
+        state._preprocess(frame)
+        t.append(time.perf_counter())
+
+        state.detect_changes(frame)
+        t.append(time.perf_counter())
+
+        blobs = state.detect_blobs(frame)
+        t.append(time.perf_counter())
+
+        for point in blobs.centroids:
+            zone_manager.check_intersection(point)
+        t.append(time.perf_counter())
+
+        zone_manager.zones_at(blobs.centroids, (w, h))
+        t.append(time.perf_counter())
+
+        zone_manager.blobs_zone_pixels(blobs, size=(w, h))
+        t.append(time.perf_counter())
+
+        video = renderer.draw_video(canvas, frame)
+        t.append(time.perf_counter())
+
+        renderer.draw_zones_on_video(video, zone_manager, renderer.video_transform)
+        t.append(time.perf_counter())
+
+        renderer.render(canvas, None, state, log_manager, metrics)
+        t.append(time.perf_counter())
+
+        if timed:
+            for stage, start, end in zip(STAGES, t, t[1:]):
+                times[stage].append((end - start) * 1000)
+            total.append(sum(times[stage][-1] for stage in PIPELINE_STAGES))
+    camera.release()
+
+    if not total:
+        raise RuntimeError(f"Source {source} has fewer than {warmup + 1} frames")
+    results = {stage: summarize(times[stage]) for stage in STAGES}
+    results['pipeline'] = summarize(total)
+    return f"{w}x{h}", results
+
+def bench_memory(source, frames, warmup, zones, seed, pooled):
+    """
+    Allocation per frame of the dashboard loop stages over 'frames' frames of 'source'.
+    Returns {'peak_kb': summary of the per-frame peaks, 'kept_kb': mean bytes left allocated, 'pool_mb'}.
+    """
+    from src.ui_renderer import UIRenderer
+
+    camera, reference = open_bench_source(source)
+    h, w = reference.shape[:2]
+    state = StateManager()
+    state.buffers.enabled = pooled
+    state.set_hot(reference)
+    zone_manager = ZoneManager()
+    make_zones(zone_manager, w, h, zones, seed)
+    renderer = UIRenderer()
+    log_manager = LogManager()
+    canvas = np.zeros((720, 1270, 3), dtype=np.uint8)
+    metrics = {'fps': 0.0, 'latency': 0.0, 'proc': 'CPU'}
+
+    peaks, kept = [], []
+    tracemalloc.start()
+    try:
+        for i in range(warmup + frames):
+            frame = camera.read_frame() # Capture is outside the measurement
+            if frame is None:
+                break
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+            video = renderer.draw_video(canvas, frame)
+            blobs = state.detect_blobs(frame)
+            zone_manager.blobs_zone_pixels(blobs, size=(w, h))
+            renderer.draw_zones_on_video(video, zone_manager, renderer.video_transform)
+            renderer.draw_blobs(video, blobs, renderer.video_transform)
+            renderer.render(canvas, None, state, log_manager, metrics)
+
+            current, peak = tracemalloc.get_traced_memory()
+            del video, blobs
+            if i >= warmup:
+                peaks.append((peak - before) / 1024)
+                kept.append((current - before) / 1024)
+    finally:
+        tracemalloc.stop()
+        camera.release()
+
+    if not peaks:
+        raise RuntimeError(f"Source {source} has fewer than {warmup + 1} frames")
+    peaks = np.array(peaks)
+    return f"{w}x{h}", {
+        'peak_kb_p50': float(np.percentile(peaks, 50)),
+        'peak_kb_max': float(peaks.max()),
+        'kept_kb': float(np.mean(kept)),
+        'pool_mb': state.buffers.nbytes() / 1e6,
+    }
+
+def run_memory(args):
+    if args.source == "synthetic":
+        sources = [f"synthetic:{w}x{h}:{args.blobs}:{args.seed}" for w, h in args.resolutions]
+    else:
+        sources = [args.source]
+
+    print(f"{'resolution':>10} {'pool':>5} {'peak KB p50':>12} {'peak KB max':>12} {'kept KB':>8} {'pool MB':>8}")
+    for source in sources:
+        for pooled in (False, True):
+            resolution, r = bench_memory(source, args.frames, args.warmup, args.zones, args.seed, pooled)
+            print(f"{resolution:>10} {'on' if pooled else 'off':>5} {r['peak_kb_p50']:12.1f} {r['peak_kb_max']:12.1f} "
+                  f"{r['kept_kb']:8.1f} {r['pool_mb']:8.1f}")
+
+def run_stages(args):
+    if args.source == "synthetic":
+        sources = [f"synthetic:{w}x{h}:{args.blobs}:{args.seed}" for w, h in args.resolutions]
+    else:
+        sources = [args.source]
+
+    report = {}
+    print(f"{'resolution':>10} {'stage':>20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fps':>8}")
+    for source in sources:
+        resolution, results = bench_stages(source, args.frames, args.warmup, args.zones, args.seed)
+        report[resolution] = results
+        for stage, r in results.items():
+            print(f"{resolution:>10} {stage:>20} {r['ms_p50']:8.2f} {r['ms_p95']:8.2f} {r['ms_p99']:8.2f} {r['fps']:8.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Results written to {args.json}")
+
+def run_downscale(args):
+    print(f"{'resolution':>10} {'scale':>6} {'p50 ms':>8} {'p95 ms':>8} {'fps':>7} {'speedup':>8} {'recall':>7} {'fp/frm':>7} {'err px':>7}")
+    for resolution in args.resolutions:
+        baseline = None
+        for k in args.downscales:
+            r = bench_downscale(resolution, k, args.frames, args.blobs, args.seed)
+            baseline = baseline or r['ms_p50']
+            print(f"{resolution[0]}x{resolution[1]:<5} {'1/' + str(k):>6} {r['ms_p50']:8.2f} {r['ms_p95']:8.2f} {r['fps']:7.1f} "
+                  f"{baseline / r['ms_p50']:7.1f}x {r['recall']:7.2%} {r['false_pos']:7.2f} {r['centroid_err']:7.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline de detección")
+    parser.add_argument("--suite", choices=("stages", "downscale", "memory"), default="stages")
+    parser.add_argument("--source", default="synthetic", help="'synthetic' (usa --resolutions), archivo de video o carpeta de imágenes")
+    parser.add_argument("--resolutions", nargs="+", default=["1920x1080"], type=parse_resolution)
+    parser.add_argument("--downscales", nargs="+", default=[1, 2, 4], type=int)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10, help="Frames iniciales no medidos")
+    parser.add_argument("--blobs", type=int, default=8)
+    parser.add_argument("--zones", type=int, default=4, help="Zonas aleatorias para la suite de etapas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Guardar los resultados de la suite de etapas en JSON")
+    args = parser.parse_args()
+
+    if args.suite == "downscale":
+        run_downscale(args)
+    elif args.suite == "memory":
+        run_memory(args)
+    else:
+        run_stages(args)
+
+if __name__ == "__main__":
+    main()
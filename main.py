@@ -1,11 +1,23 @@
+import time
+STARTED = time.perf_counter() # Startup profile reference, taken before the heavy imports
+
 import cv2
 import numpy as np
 from src.camera_manager import CameraManager
 from src.zone_manager import ZoneManager
 from src.state_manager import StateManager
-from src.ui_renderer import UIRenderer
 from src.log_manager import LogManager
-import time
+from src.detection_pipeline import DetectionPipeline
+from src.detection_scheduler import DetectionScheduler
+from src.blobs import Blobs
+from src.background_model import BACKGROUND_MODES
+from src.profiler import StageProfiler, StartupProfile
+from src.clip_recorder import ClipRecorder
+from src.preview_server import PreviewServer
+from src.alarm_dispatcher import AlarmDispatcher, create_sink
+from src.event_journal import EventJournal, query_journal
+from src.armed_snapshot import save_snapshot, load_snapshot, remove_snapshot, default_snapshot_path
+import argparse
 
 # Global references
 current_hitboxes = []
@@ -113,15 +125,62 @@ def mouse_callback(event, x, y, flags, param):
                  zone_manager.clear_current_zone()
                  if log_manager: log_manager.add_log("INFO", "Cancelado trazado de zona")
 
-def main():
+def main(args=None):
     global renderer, zone_manager, log_manager, current_hitboxes, actions_queue, app_state
+    # Imported here so headless runs never load the dashboard
+    from src.ui_renderer import UIRenderer
     
+    startup = StartupProfile(STARTED)
+    startup.mark("imports")
+
     # Initialize Configuration
-    camera = CameraManager(0)
+    source = args.source if args is not None else 0
+    split = None
+    if args is not None and args.multiprocess:
+        # Capture and detection in their own processes, frames shared through a memory ring
+        from src.detection_process import SplitProcesses
+        config = {name: getattr(args, name) for name in DetectionScheduler.SETTINGS}
+        config['profile'] = not args.no_profile
+        config['buffer_pool'] = not args.no_buffer_pool
+        split = SplitProcesses(source, args.loop, config, slots=args.bus_slots)
+        camera = split.camera
+    else:
+        # Opened in the capture thread: the dashboard comes up while the driver negotiates the resolution
+        camera = CameraManager(source, threaded=True, loop=args is not None and args.loop, open_async=True)
     zone_manager = ZoneManager()
     state_manager = StateManager()
+
+    # Warm start: settings, zones and view now, armed on the first frame that matches the saved reference
+    snapshot_path = snapshot_file(args)
+    warm_snapshot = None
+    if snapshot_path is not None and (args is None or not args.no_warm_start):
+        warm_snapshot = load_snapshot(snapshot_path)
+    if warm_snapshot is not None:
+        state_manager.apply_settings(warm_snapshot['settings'])
+    if args is not None:
+        # Options given on the command line win over the snapshot (the others are None)
+        state_manager.apply_settings(vars(args))
+    if warm_snapshot is not None:
+        zone_manager.set_zones(warm_snapshot['zones'])
+        view = warm_snapshot['view']
+        app_state.zoom_level = state_manager.zoom_level = view.get('zoom_level', 1.0)
+        app_state.offset_x = view.get('offset_x', 0)
+        app_state.offset_y = view.get('offset_y', 0)
+    # Per-stage timing (shared with the StateManager so detection stages are included)
+    profiler = StageProfiler(enabled=args is None or not args.no_profile)
+    state_manager.profiler = profiler
+    scheduler = DetectionScheduler.from_settings(vars(args) if args is not None else {})
+    if split is not None:
+        pipeline = split.create_pipeline(state_manager, zone_manager)
+    else:
+        pipeline = DetectionPipeline(state_manager, zone_manager, scheduler=scheduler)
     renderer = UIRenderer()
-    log_manager = LogManager()
+    if args is not None and args.no_buffer_pool:
+        state_manager.buffers.enabled = False
+    log_manager = LogManager(journal=create_journal(args))
+    recorder = create_recorder(args)
+    preview_server = create_preview_server(args, ("video", "dashboard"))
+    dispatcher = create_dispatcher(args)
     
     # Dashboard Canvas (Fixed Resolution)
     CANVAS_W = 1270
@@ -131,32 +190,61 @@ def main():
     window_name = "Sistema de Seguridad Visual Industrial"
     cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
     cv2.setMouseCallback(window_name, mouse_callback)
+    startup.mark("ui_ready")
     
     log_manager.add_log("INFO", "Dashboard HMI Inicializado Correctamente.")
     log_manager.add_log("INFO", "[ESPACIO] Alternar Mano/Dibujo")
+    log_manager.add_log("INFO", "[B] Cambiar modelo de fondo")
 
     loop_counter = 0
     avg_fps = 0
     last_intrusion_count = 0
+    last_reconnect_time = time.monotonic()
+    last_profile_print = time.monotonic()
+    last_recorded_seq = None
+    
+    # Detection runs on the whole camera frame (zoom/pan only change the display);
+    # its results are reused until the camera delivers a new frame
+    last_detect_seq = None
+    blobs = Blobs.empty()
+    hit_points = []
+    hit_areas = []
+    zones_hit = []
+    tracks = None
 
     while True:
-        start_time = time.time()
+        loop_start = time.perf_counter_ns()
         
-        # 1. Read Frame (Robust)
-        frame = camera.read_frame()
+        # 1. Read Frame (Robust) - waits briefly for a new frame so the loop follows the camera rate
+        with profiler.span("capture"):
+            packet = camera.read_latest(timeout=0.05)
+        start_time = time.perf_counter()
+        frame = packet.frame if packet is not None else None
         
         if frame is None:
             # Create a black frame to keep UI alive
             frame = np.zeros((480, 640, 3), dtype=np.uint8)
             cv2.putText(frame, "SIN SEÑAL DE VIDEO", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
             
-            # Try to reconnect every ~2s (assuming 30fps = 60 frames)
-            if loop_counter % 60 == 0:
+            # Try to reconnect every ~2s (not while the first open is still in progress;
+            # with --multiprocess the capture process reconnects by itself)
+            if camera.is_opening() or split is not None:
+                last_reconnect_time = time.monotonic()
+            elif time.monotonic() - last_reconnect_time > 2.0:
+                 last_reconnect_time = time.monotonic()
                  print("[INFO] Intentando reconectar cámara...")
                  camera.release()
                  try:
-                    camera = CameraManager(camera.camera_id)
+                    camera = CameraManager(camera.camera_id, threaded=True, loop=camera.loop)
                  except: pass
+        else:
+            last_reconnect_time = time.monotonic()
+            if startup.mark("first_frame"):
+                print(f"[STARTUP] {startup.summary()}")
+            if recorder is not None and packet.seq != last_recorded_seq:
+                # Full camera frame into the pre-alarm ring (sampled and scaled by the recorder)
+                last_recorded_seq = packet.seq
+                recorder.add_frame(packet.frame, packet.timestamp)
         
         # Update State
         h, w = frame.shape[:2]
@@ -177,37 +265,67 @@ def main():
         app_state.offset_x = max(0, min(max_offset_x, app_state.offset_x))
         app_state.offset_y = max(0, min(max_offset_y, app_state.offset_y))
         
-        cropped_frame = frame[app_state.offset_y:app_state.offset_y+new_h, 
-                              app_state.offset_x:app_state.offset_x+new_w]
-                              
-        display_frame = cropped_frame.copy()
+        with profiler.span("video"):
+            # Crop + scale in one step, straight into the dashboard; overlays are then drawn
+            # on the video slot at display resolution (the camera frame is never copied)
+            video = renderer.draw_video(canvas, frame, (app_state.offset_x, app_state.offset_y, new_w, new_h),
+                                        state_manager.high_quality)
+            view = renderer.video_transform
+
+        if warm_snapshot is not None and packet is not None:
+            reference = warm_snapshot['reference_frame']
+            if reference.shape == frame.shape:
+                # Copied out of the map so the file can be replaced by the next save (Windows locks mapped files)
+                state_manager.restore_hot(np.array(reference), np.array(warm_snapshot['reference_gray']))
+                log_manager.add_log("INFO", "Sistema ARMADO (HOT) desde el estado guardado")
+            else:
+                log_manager.add_log("ERROR", f"Estado guardado no coincide con la cámara ({reference.shape[1]}x{reference.shape[0]})")
+            warm_snapshot = None
+        if state_manager.is_hot() and startup.mark("armed"):
+            print(f"[STARTUP] {startup.summary()}")
+            log_manager.add_log("INFO", f"Arranque: {startup.summary()}")
+
+        if split is not None:
+            pipeline.sync() # Arming, sliders and zones to the detection process; its results back
 
         # 3. Processing (if Hot)
         if state_manager.is_hot():
-            contours = state_manager.detect_changes(display_frame)
-            renderer.draw_detections(display_frame, contours)
+            # Camera space, once per new camera frame (never on the "no signal" placeholder)
+            if packet is not None and packet.seq != last_detect_seq:
+                last_detect_seq = packet.seq
+                result = pipeline.process(frame, (0, 0), (w, h), packet.timestamp)
+                blobs = result['blobs']
+                hit_points = result['hits']
+                hit_areas = result['areas']
+                zones_hit = result['zones_hit']
+                tracks = result['tracks']
+                if result['new_intrusion'] and recorder is not None:
+                    recorder.trigger(frame, {'zones': zones_hit, 'intrusions': state_manager.intrusions})
+                for event in result['events']:
+                    if event['type'] == 'EXIT':
+                        log_manager.add_log("SALIDA", f"Objeto #{event['track']} salió de zona {event['zone']} ({event['dwell']:.1f}s)",
+                                            zone=event['zone'], track=event['track'], dwell=event['dwell'])
             
-            intrusion_detected = False
-            for c in contours:
-                M = cv2.moments(c)
-                if M["m00"] != 0:
-                    dx = int(M["m10"] / M["m00"])
-                    dy = int(M["m01"] / M["m00"])
-                    
-                    # Convert 'dx, dy' (Crop Space) to Camera Space for Zone Check
-                    rx = int(dx + app_state.offset_x)
-                    ry = int(dy + app_state.offset_y)
-                    
-                    if zone_manager.check_intersection((rx, ry)):
-                        intrusion_detected = True
-                        cv2.circle(display_frame, (dx, dy), 10, (0, 0, 255), -1)
-                        
-            state_manager.update_intrusion_status(intrusion_detected)
+            with profiler.span("overlay"):
+                # Camera Space -> video slot (display resolution)
+                renderer.draw_blobs(video, blobs, view)
+                if tracks is not None:
+                    renderer.draw_tracks(video, tracks, view)
+                renderer.draw_hits(video, hit_points, view)
+            
+            intrusion_detected = len(hit_points) > 0
             if intrusion_detected:
                  renderer.trigger_visual_alarm(canvas)
                  # Log on rising edge only (when count increases)
                  if state_manager.intrusions > last_intrusion_count:
-                     log_manager.add_log("ALARMA", f"Intrusión Detectada! (Nivel {state_manager.intrusions})")
+                     message = f"Intrusión Detectada! Zonas {zones_hit} (Nivel {state_manager.intrusions})"
+                     alarm = {'zone': zones_hit[0] if zones_hit else None, 'zones': zones_hit,
+                              'intrusions': state_manager.intrusions,
+                              'area': float(max(hit_areas)) if hit_areas else None,
+                              'seq': last_detect_seq, 'tracks': entered_tracks(result)}
+                     log_manager.add_log("ALARMA", message, **alarm)
+                     if dispatcher is not None:
+                         dispatcher.dispatch(dict(alarm, type="ALARMA", time=time.time(), message=message))
                      last_intrusion_count = state_manager.intrusions
 
         # Sync local counter if reset
@@ -216,11 +334,24 @@ def main():
 
 
         # 4. Render Zones (On Video Frame)
-        renderer.draw_zones_on_video(display_frame, zone_manager, app_state)
+        with profiler.span("zone_overlay"):
+            renderer.draw_zones_on_video(video, zone_manager, view)
+
+        # Remote viewers (copied only when someone is watching, encoded in the server thread)
+        if preview_server is not None:
+            preview_server.publish("video", video)
+
+        # Finished / dropped alarm clips, failed alarm deliveries
+        if recorder is not None:
+            for report in recorder.poll():
+                log_clip_report(log_manager, report)
+        if dispatcher is not None:
+            for report in dispatcher.poll():
+                log_dispatch_report(log_manager, report)
 
         # 5. Render Main Dashboard
         # Calculate Metrics (Smoothed FPS)
-        elapsed = time.time() - start_time
+        elapsed = time.perf_counter() - start_time
         current_fps = 1.0 / elapsed if elapsed > 0 else 0
         
         # Simple Exponential Moving Average
@@ -229,21 +360,33 @@ def main():
         
         process_time_ms = elapsed * 1000
         
+        # Everything runs on the CPU (no OpenCL/CUDA path); show the slowest stage instead
+        proc = 'CPU'
+        if profiler.enabled:
+            stage, stage_ms = profiler.bottleneck(exclude=("frame", "capture"))
+            if stage is not None:
+                proc = f"CPU | max: {stage} {stage_ms:.1f}ms"
         metrics = {
             'fps': avg_fps,
             'latency': process_time_ms,
-            'proc': 'GPU (OpenCL)' if state_manager.use_gpu else 'CPU'
+            'proc': proc
         }
         
         # !!! RENDER CALL !!!
         # This updates 'current_hitboxes' implicitly for next frame since we return it
-        current_hitboxes = renderer.render(canvas, display_frame, state_manager, log_manager, metrics)
-        
-        # --- DRAW CURRENT MODE OVERLAY ---
-        mode_text = "[MANO - PANNING]" if app_state.is_hand_mode else "[DIBUJO ZONAS]"
-        mode_color = (0, 255, 255) if app_state.is_hand_mode else (255, 100, 200)
-        cv2.putText(canvas, mode_text, (20, 680), cv2.FONT_HERSHEY_SIMPLEX, 0.7, mode_color, 2)
-        cv2.putText(canvas, "Presiona ESPACIO para cambiar", (20, 705), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
+        with profiler.span("render"):
+            current_hitboxes = renderer.render(canvas, None, state_manager, log_manager, metrics)
+            
+            # --- DRAW CURRENT MODE OVERLAY ---
+            mode_text = "[MANO - PANNING]" if app_state.is_hand_mode else "[DIBUJO ZONAS]"
+            mode_color = (0, 255, 255) if app_state.is_hand_mode else (255, 100, 200)
+            cv2.putText(canvas, mode_text, (20, 680), cv2.FONT_HERSHEY_SIMPLEX, 0.7, mode_color, 2)
+            cv2.putText(canvas, "Presiona ESPACIO para cambiar", (20, 705), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
+        if preview_server is not None:
+            preview_server.publish("dashboard", canvas)
+            preview_server.set_status(hot=state_manager.is_hot(), intrusion=state_manager.intrusion_active,
+                                      intrusions=state_manager.intrusions, zones=len(zone_manager.get_zones()),
+                                      fps=round(avg_fps, 1))
         
         # 6. Handle Interaction Queue
         max_actions_per_frame = 5
@@ -255,24 +398,42 @@ def main():
             
             if act == 'SET_COLD': 
                 state_manager.set_cold()
+                pipeline.reset()
+                last_detect_seq, blobs, hit_points, hit_areas, zones_hit, tracks = None, Blobs.empty(), [], [], [], None
+                if snapshot_path is not None:
+                    remove_snapshot(snapshot_path) # A restart after disarming stays disarmed
                 log_manager.add_log("INFO", "Sistema en modo COLD")
             elif act == 'SET_HOT': 
-                # BUG FIX: Use cropped_frame (Clean) instead of display_frame (Painted)
-                state_manager.set_hot(cropped_frame)
+                # Whole clean camera frame: the reference does not depend on zoom/pan
+                state_manager.set_hot(frame)
+                pipeline.reset() # Tracks of the previous arming must not raise EXIT/ENTER events
+                last_detect_seq, blobs, hit_points, hit_areas, zones_hit, tracks = None, Blobs.empty(), [], [], [], None
+                save_armed_state(snapshot_path, state_manager, zone_manager)
                 log_manager.add_log("INFO", "Sistema ARMADO (HOT)")
             elif act == 'SAVE_ZONES': 
                 zone_manager.save_zones()
+                save_armed_state(snapshot_path, state_manager, zone_manager)
                 log_manager.add_log("INFO", "Zonas Guardadas")
             elif act == 'LOAD_ZONES': 
                 zone_manager.load_zones()
+                save_armed_state(snapshot_path, state_manager, zone_manager)
                 log_manager.add_log("INFO", "Zonas Cargadas")
             elif act == 'EXIT_APP': 
+                save_armed_state(snapshot_path, state_manager, zone_manager)
                 camera.release()
+                if recorder is not None: recorder.close()
+                if preview_server is not None: preview_server.close()
+                if dispatcher is not None: dispatcher.close()
+                log_manager.close()
                 cv2.destroyAllWindows()
                 return
                 
             elif act == 'TOGGLE_GPU': state_manager.use_gpu = not state_manager.use_gpu
             elif act == 'TOGGLE_HQ': state_manager.high_quality = not state_manager.high_quality
+            elif act == 'TOGGLE_ZONE_ONLY':
+                state_manager.zone_restricted = not state_manager.zone_restricted
+                last_detect_seq = None
+                log_manager.add_log("INFO", "Detección solo en zonas" if state_manager.zone_restricted else "Detección en cuadro completo")
             
             # Slider Logic
             elif 'SLIDER' in act:
@@ -293,19 +454,306 @@ def main():
                     state_manager.zoom_level = val_float
 
         # 7. Show Window
-        cv2.imshow(window_name, canvas)
-        
-        key = cv2.waitKey(1) & 0xFF
+        with profiler.span("display"):
+            cv2.imshow(window_name, canvas)
+            
+            key = cv2.waitKey(1) & 0xFF
+        if profiler.enabled:
+            profiler.record("frame", time.perf_counter_ns() - loop_start)
+            if time.monotonic() - last_profile_print > 10.0:
+                last_profile_print = time.monotonic()
+                detect_stats = scheduler.get_stats() if split is None else pipeline.detect_stats
+                print(f"[PERF] {w}x{h} zonas={len(zone_manager.get_zones())} "
+                      f"detección={detect_stats['runs']}/{detect_stats['checks']} {profiler.summary()}")
+                if split is not None and pipeline.perf:
+                    print(f"[PERF] proceso de detección: {pipeline.perf} (frames pisados={pipeline.torn})")
         if key == ord('q'): break
         elif key == 32: # SPACE BAR
              app_state.is_hand_mode = not app_state.is_hand_mode
              mode_msg = "Activado Modo MANO (Panning)" if app_state.is_hand_mode else "Activado Modo DIBUJO"
              log_manager.add_log("INFO", mode_msg)
+        elif key == ord('b'): # Cycle background engine
+             idx = BACKGROUND_MODES.index(state_manager.background_mode)
+             state_manager.set_background_mode(BACKGROUND_MODES[(idx + 1) % len(BACKGROUND_MODES)])
+             last_detect_seq = None
+             log_manager.add_log("INFO", f"Modelo de fondo: {state_manager.background_mode}")
         
         loop_counter += 1
         
+    save_armed_state(snapshot_path, state_manager, zone_manager) # Keeps slider changes made while armed
     camera.release()
+    if recorder is not None: recorder.close()
+    if preview_server is not None: preview_server.close()
+    if dispatcher is not None: dispatcher.close()
+    log_manager.close()
+    cv2.destroyAllWindows()
+
+DEFAULT_SNAPSHOT = default_snapshot_path() # Not the working directory, so it never ends up in a checkout
+
+def snapshot_file(args):
+    """Path of the armed-state snapshot, or None if it is disabled."""
+    if args is None:
+        return DEFAULT_SNAPSHOT
+    return args.snapshot or DEFAULT_SNAPSHOT
+
+def save_armed_state(path, state_manager, zone_manager):
+    """Saves the armed state for the next warm start (nothing while COLD)."""
+    if path is None or not state_manager.is_hot():
+        return
+    view = {'zoom_level': app_state.zoom_level, 'offset_x': app_state.offset_x, 'offset_y': app_state.offset_y}
+    try:
+        save_snapshot(path, state_manager, zone_manager, view)
+    except OSError as e:
+        print(f"[ERROR] Could not save snapshot {path}: {e}")
+
+def create_recorder(args):
+    """ClipRecorder from the command line options, or None if clip recording is off."""
+    if args is None or not args.record_clips:
+        return None
+    return ClipRecorder(args.record_clips, pre_seconds=args.pre_seconds, post_seconds=args.post_seconds,
+                        fps=args.clip_fps, scale=args.clip_scale)
+
+def create_preview_server(args, streams):
+    """PreviewServer from the command line options, or None if the HTTP preview is off."""
+    if args is None or not args.http_port:
+        return None
+    server = PreviewServer(args.http_port, args.http_host, fps=args.http_fps, quality=args.http_quality, streams=streams)
+    print(f"[INFO] Vista remota en http://{args.http_host}:{server.port}/")
+    return server
+
+def create_dispatcher(args):
+    """AlarmDispatcher for the --alarm-sink destinations, or None if there are none."""
+    if args is None or not args.alarm_sink:
+        return None
+    return AlarmDispatcher([create_sink(spec) for spec in args.alarm_sink], retries=args.alarm_retries)
+
+def log_dispatch_report(log_manager, report):
+    log_manager.add_log("ERROR", f"Alarma no entregada a {report['sink']}: {report['error']}",
+                        sink=report['sink'], events=report['events'])
+
+def create_journal(args):
+    """EventJournal from the command line options, or None if the journal is off."""
+    if args is None or not args.journal:
+        return None
+    return EventJournal(args.journal, max_bytes=int(args.journal_max_mb * 1024 * 1024), max_age=args.journal_max_hours * 3600)
+
+def parse_time(value):
+    """Epoch seconds or local 'YYYY-MM-DD HH:MM[:SS]'."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Fecha inválida: {value}")
+
+def print_journal(args):
+    """Prints the journal events between --since and --until."""
+    events = query_journal(args.journal, args.since, args.until,
+                           types=[args.event_type] if args.event_type else None,
+                           camera=args.camera, zone=args.zone)
+    for event in events:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event['ts']))
+        details = " ".join(f"{k}={v}" for k, v in event.items() if k not in ('ts', 'type', 'message') and v is not None)
+        print(f"{when} {event['type']:<7} {event['message']} {details}")
+    print(f"[INFO] {len(events)} eventos")
+
+def entered_tracks(result):
+    """IDs of the tracks that entered a zone in this detection result."""
+    return [e['track'] for e in result['events'] if e['type'] == 'ENTER']
+
+def log_clip_report(log_manager, report):
+    if report['type'] == 'CLIP':
+        msg = f"Clip guardado: {report['path']} ({report['seconds']:.1f}s)"
+        if report['lost']:
+            msg += f" - {report['lost']} frames perdidos (codificador lento)"
+        log_manager.add_log("INFO", msg, path=report['path'], snapshot=report['snapshot'], lost=report['lost'])
+    else:
+        log_manager.add_log("ERROR", f"Clip descartado: codificador saturado ({report['pending']} pendientes)")
+
+def parse_source(value):
+    """Numeric strings are device indexes, anything else is a path/URL."""
+    return int(value) if value.isdigit() else value
+
+def run_multi_camera(args):
+    """Supervisor UI: one detection worker process per camera, mosaic of low-rate previews."""
+    from src.camera_supervisor import CameraSupervisor
+    from src.ui_renderer import UIRenderer
+
+    sources = [parse_source(s) for s in args.cameras]
+    if args.zones and len(args.zones) not in (1, len(sources)):
+        print("[ERROR] --zones debe tener un archivo o uno por cámara")
+        return
+
+    configs = []
+    for i, source in enumerate(sources):
+        if args.zones:
+            zones_file = args.zones[0] if len(args.zones) == 1 else args.zones[i]
+        else:
+            zones_file = f"zones_cam{i}.json"
+        configs.append({
+            'source': source,
+            'zones': zones_file,
+            'arm_after': args.arm_after,
+            'preview_fps': args.preview_fps,
+            'loop': args.loop,
+        })
+        configs[-1].update({name: getattr(args, name) for name in StateManager.SETTINGS + DetectionScheduler.SETTINGS
+                            if hasattr(args, name)})
+
+    supervisor = CameraSupervisor(configs)
+    supervisor.start()
+
+    renderer = UIRenderer()
+    log_manager = LogManager(journal=create_journal(args))
+    preview_server = create_preview_server(args, ("dashboard",))
+    dispatcher = create_dispatcher(args)
+    canvas = np.zeros((720, 1270, 3), dtype=np.uint8)
+    tiles = [{'image': None, 'label': f"CAM {i} ({s})", 'hot': False, 'intrusion': False, 'intrusions': 0, 'fps': 0}
+             for i, s in enumerate(sources)]
+
+    window_name = "Sistema de Seguridad Visual Industrial - Multicámara"
+    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+    log_manager.add_log("INFO", f"{len(sources)} cámaras iniciadas")
+
+    while True:
+        for kind, cam, info in supervisor.poll():
+            if kind == 'preview':
+                buf = np.frombuffer(info['jpeg'], dtype=np.uint8)
+                tiles[cam]['image'] = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+                tiles[cam].update(hot=info['hot'], intrusion=info['intrusion'],
+                                  intrusions=info['intrusions'], fps=info['fps'])
+            elif info['type'] == 'INTRUSION':
+                tiles[cam]['intrusions'] = info['intrusions']
+                message = f"CAM {cam}: Intrusión Detectada! Zonas {info['zones']} (Nivel {info['intrusions']})"
+                alarm = {'camera': cam, 'zone': info['zones'][0] if info['zones'] else None, 'zones': info['zones'],
+                         'intrusions': info['intrusions'], 'area': info.get('area'), 'seq': info['seq'],
+                         'tracks': info.get('tracks')}
+                log_manager.add_log("ALARMA", message, **alarm)
+                if dispatcher is not None:
+                    dispatcher.dispatch(dict(alarm, type="ALARMA", time=info['time'], message=message))
+            elif info['type'] == 'TRACK_EXIT':
+                log_manager.add_log("SALIDA", f"CAM {cam}: Objeto #{info['track']} salió de zona {info['zone']} ({info['dwell']:.1f}s)",
+                                    camera=cam, zone=info['zone'], seq=info['seq'], track=info['track'], dwell=info['dwell'])
+            elif info['type'] == 'HOT':
+                log_manager.add_log("INFO", f"CAM {cam}: Sistema ARMADO (HOT)")
+            elif info['type'] == 'COLD':
+                log_manager.add_log("INFO", f"CAM {cam}: Sistema en modo COLD")
+            elif info['type'] == 'STOPPED':
+                log_manager.add_log("ERROR", f"CAM {cam}: Proceso detenido")
+
+        if dispatcher is not None:
+            for report in dispatcher.poll():
+                log_dispatch_report(log_manager, report)
+
+        total_fps = sum(t['fps'] for t in tiles)
+        metrics = {'fps': total_fps, 'latency': 0.0, 'proc': f"{len(sources)} procesos"}
+        renderer.render_camera_grid(canvas, tiles, log_manager, metrics)
+        if preview_server is not None:
+            preview_server.publish("dashboard", canvas)
+            preview_server.set_status(cameras=[{'hot': t['hot'], 'intrusion': t['intrusion'], 'intrusions': t['intrusions'],
+                                                'fps': round(t['fps'], 1)} for t in tiles])
+        cv2.imshow(window_name, canvas)
+
+        key = cv2.waitKey(30) & 0xFF
+        if key == ord('q'): break
+        elif key == ord('h'): supervisor.send(None, {'action': 'SET_HOT'})
+        elif key == ord('c'): supervisor.send(None, {'action': 'SET_COLD'})
+
+    supervisor.stop()
+    if preview_server is not None: preview_server.close()
+    if dispatcher is not None: dispatcher.close()
+    log_manager.close()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Sistema de Seguridad Visual Industrial")
+    parser.add_argument("--cameras", nargs="+", help="Fuentes de video (índice o ruta); activa el modo multicámara")
+    parser.add_argument("--zones", nargs="+", help="Archivo de zonas (uno para todas o uno por cámara)")
+    parser.add_argument("--arm-after", type=int, default=0, help="Armar cada cámara tras N frames (0 = manual)")
+    parser.add_argument("--preview-fps", type=float, default=2.0, help="Frecuencia de las vistas previas multicámara")
+    parser.add_argument("--background", dest="background_mode", choices=BACKGROUND_MODES, help="Modelo de fondo para la detección (por defecto static)")
+    parser.add_argument("--learning-rate", type=float, help="Tasa de aprendizaje del modelo de fondo (por defecto 0.005)")
+    parser.add_argument("--update-interval", type=int, help="Frames entre actualizaciones del modelo de fondo (por defecto 5)")
+    parser.add_argument("--detection-downscale", type=int, help="Detectar a 1/N de la resolución de cámara (1, 2, 4; por defecto 1)")
+    parser.add_argument("--threshold", type=int, help="Umbral de diferencia (por defecto 25)")
+    parser.add_argument("--min-area", type=int, help="Área mínima de un blob en px (por defecto 500)")
+    parser.add_argument("--zone-restricted", action="store_true", default=None, help="Detectar solo dentro de las zonas")
+    parser.add_argument("--detect-fps", type=float, default=0.0, help="Máximo de detecciones por segundo (0 = cada frame)")
+    parser.add_argument("--max-detect-interval", type=float, default=1.0, help="Segundos máximos entre detecciones completas con la escena quieta")
+    parser.add_argument("--no-motion-gate", dest="motion_gate", action="store_false", help="Detectar siempre, sin el filtro rápido de movimiento")
+    # Headless mode
+    parser.add_argument("--headless", action="store_true", help="Sin ventana: captura -> detección -> eventos")
+    parser.add_argument("--source", type=parse_source, default=0, help="Fuente de video: índice de cámara, archivo, carpeta de imágenes o synthetic:WxH:N")
+    parser.add_argument("--loop", action="store_true", help="Repetir archivos y carpetas de imágenes al terminar")
+    parser.add_argument("--arm-frames", type=int, default=30, help="Armar con el promedio de los primeros N frames")
+    parser.add_argument("--reference", help="Imagen de referencia guardada para armar al instante")
+    parser.add_argument("--save-reference", help="Guardar la referencia calculada en este archivo")
+    parser.add_argument("--events-file", help="Añadir los eventos de intrusión a este archivo JSONL")
+    parser.add_argument("--duration", type=float, help="Detener el modo headless tras N segundos")
+    # Offline analysis of recordings
+    parser.add_argument("--analyze", nargs="+", metavar="VIDEO", help="Analizar grabaciones (archivos o carpetas de imágenes) en paralelo y salir")
+    parser.add_argument("--segment-seconds", type=float, default=60.0, help="Duración de cada segmento del análisis")
+    parser.add_argument("--warmup-seconds", type=float, default=5.0, help="Segundos previos a cada segmento para calentar el modelo de fondo y el seguimiento")
+    parser.add_argument("--workers", type=int, default=0, help="Procesos del análisis (0 = todos los núcleos)")
+    parser.add_argument("--report", help="Guardar la línea de tiempo y el resumen del análisis en este archivo JSON")
+    # Alarm clips
+    parser.add_argument("--record-clips", metavar="DIR", help="Guardar clips pre/post alarma y capturas en esta carpeta")
+    parser.add_argument("--pre-seconds", type=float, default=5.0, help="Segundos guardados antes de la alarma")
+    parser.add_argument("--post-seconds", type=float, default=5.0, help="Segundos grabados después de la última alarma")
+    parser.add_argument("--clip-fps", type=float, default=10.0, help="Frecuencia de los clips")
+    parser.add_argument("--clip-scale", type=float, default=0.5, help="Escala de los clips respecto a la cámara")
+    # Event journal
+    parser.add_argument("--journal", metavar="DIR", help="Guardar todos los eventos en un diario SQLite en esta carpeta")
+    parser.add_argument("--journal-max-mb", type=float, default=64, help="Rotar el archivo del diario al superar este tamaño")
+    parser.add_argument("--journal-max-hours", type=float, default=24, help="Rotar el archivo del diario tras estas horas")
+    parser.add_argument("--query-journal", action="store_true", help="Listar los eventos del diario y salir")
+    parser.add_argument("--since", type=parse_time, help="Inicio de la consulta (época o 'AAAA-MM-DD HH:MM')")
+    parser.add_argument("--until", type=parse_time, help="Fin de la consulta (época o 'AAAA-MM-DD HH:MM')")
+    parser.add_argument("--event-type", help="Filtrar la consulta por tipo (ALARMA, INFO, ...)")
+    parser.add_argument("--camera", type=int, help="Filtrar la consulta por cámara")
+    parser.add_argument("--zone", type=int, help="Filtrar la consulta por zona")
+    parser.add_argument("--no-profile", action="store_true", help="Desactivar la medición de tiempos por etapa")
+    parser.add_argument("--no-buffer-pool", action="store_true", help="Reservar imágenes nuevas en cada frame (sin reutilizar búferes)")
+    # Warm start
+    parser.add_argument("--snapshot", help=f"Archivo del estado armado para el arranque en caliente (por defecto {DEFAULT_SNAPSHOT})")
+    parser.add_argument("--no-warm-start", action="store_true", help="No rearmar al iniciar desde el estado guardado")
+    # Alarm delivery
+    parser.add_argument("--alarm-sink", action="append", metavar="DESTINO",
+                        help="Enviar alarmas a http(s)://..., tcp://host:puerto, udp://host:puerto, exec:comando o file:ruta (repetible)")
+    parser.add_argument("--alarm-retries", type=int, default=3, help="Reintentos por destino de alarma")
+    # Process split
+    parser.add_argument("--multiprocess", action="store_true", help="Captura, detección y panel en procesos separados (memoria compartida)")
+    parser.add_argument("--bus-slots", type=int, default=6, help="Frames en el anillo de memoria compartida con --multiprocess")
+    # Remote preview
+    parser.add_argument("--http-port", type=int, help="Servir el video y el panel como MJPEG en este puerto")
+    parser.add_argument("--http-host", help="Dirección del servidor de vista remota (por defecto 127.0.0.1, solo este equipo)")
+    parser.add_argument("--http-public", action="store_true", help="Permitir la vista remota desde toda la red (sin autenticación)")
+    parser.add_argument("--http-fps", type=float, default=10.0, help="Frecuencia máxima de la vista remota")
+    parser.add_argument("--http-quality", type=int, default=80, help="Calidad JPEG de la vista remota")
+    args = parser.parse_args()
+    # The preview has no authentication: only this machine unless the network is asked for explicitly
+    if args.http_host is None:
+        args.http_host = "0.0.0.0" if args.http_public else "127.0.0.1"
+    elif args.http_host in ("", "0.0.0.0", "::") and not args.http_public:
+        parser.error(f"--http-host {args.http_host!r} abre la vista remota a toda la red: añada --http-public")
+    if args.http_port and args.http_public:
+        print("[WARNING] Remote preview is reachable from the network without authentication")
+
+    if args.query_journal:
+        if not args.journal:
+            parser.error("--query-journal requiere --journal DIR")
+        print_journal(args)
+    elif args.analyze:
+        from src.offline_analysis import run_analysis
+        run_analysis(args)
+    elif args.headless:
+        from src.headless_runner import run_headless
+        run_headless(args)
+    elif args.cameras:
+        run_multi_camera(args)
+    else:
+        main(args)
@@ -0,0 +1,357 @@
+import asyncio
+import json
+import shlex
+import ssl
+import sys
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+class HttpSink:
+    """POSTs each batch as JSON {'events': [...]} to an http:// or https:// URL."""
+    def __init__(self, url, timeout=5.0):
+        self.name = url
+        self.timeout = timeout
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.https = parts.scheme == "https"
+        self.port = parts.port or (443 if self.https else 80)
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    async def send(self, events):
+        body = json.dumps({'events': events}).encode("utf-8")
+        request = (f"POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                   f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode("ascii") + body
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=ssl.create_default_context() if self.https else None),
+            self.timeout)
+        try:
+            writer.write(request)
+            await asyncio.wait_for(writer.drain(), self.timeout)
+            status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+        finally:
+            writer.close()
+        fields = status_line.split()
+        if len(fields) < 2 or not fields[1].startswith(b"2"):
+            raise ConnectionError(f"HTTP {status_line.decode('latin-1').strip() or 'sin respuesta'}")
+
+    async def close(self):
+        pass
+
+
+class TcpSink:
+    """One JSON line per event over a kept-open TCP connection (reconnects after errors)."""
+    def __init__(self, host, port, timeout=5.0):
+        self.name = f"tcp://{host}:{port}"
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._writer = None
+
+    async def send(self, events):
+        if self._writer is None or self._writer.is_closing():
+            _, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            self._writer.write(b"".join(json.dumps(e).encode("utf-8") + b"\n" for e in events))
+            await asyncio.wait_for(self._writer.drain(), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            self._writer.close()
+            self._writer = None
+            raise
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class UdpSink:
+    """One JSON datagram per event (no delivery guarantee, no retries needed)."""
+    def __init__(self, host, port):
+        self.name = f"udp://{host}:{port}"
+        self.host = host
+        self.port = port
+        self._transport = None
+
+    async def send(self, events):
+        if self._transport is None:
+            self._transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                asyncio.DatagramProtocol, remote_addr=(self.host, self.port))
+        for event in events:
+            self._transport.sendto(json.dumps(event).encode("utf-8"))
+
+    async def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+
+class ExecSink:
+    """Runs a local command per batch with the events as JSON on stdin; a non-zero exit is an error."""
+    def __init__(self, command, timeout=10.0):
+        self.name = f"exec:{command}"
+        self.args = shlex.split(command)
+        self.timeout = timeout
+
+    async def send(self, events):
+        process = await asyncio.create_subprocess_exec(*self.args, stdin=asyncio.subprocess.PIPE)
+        try:
+            await asyncio.wait_for(process.communicate(json.dumps({'events': events}).encode("utf-8")), self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        if process.returncode != 0:
+            raise RuntimeError(f"salida {process.returncode}")
+
+    async def close(self):
+        pass
+
+
+class FileSink:
+    """Appends one JSON line per event to a local file."""
+    def __init__(self, path):
+        self.name = f"file:{path}"
+        self.path = path
+
+    async def send(self, events):
+        # Small appends: cheaper inline than a round trip through an executor
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(e) + "\n" for e in events))
+
+    async def close(self):
+        pass
+
+
+def create_sink(spec):
+    """
+    Sink from a command line spec:
+        http://host:port/path, https://..., tcp://host:port, udp://host:port,
+        exec:command args, file:path
+    """
+    if spec.startswith(("http://", "https://")):
+        return HttpSink(spec)
+    if spec.startswith(("tcp://", "udp://")):
+        parts = urlsplit(spec)
+        if parts.hostname is None or parts.port is None:
+            raise ValueError(f"Falta host:puerto en {spec}")
+        return (TcpSink if parts.scheme == "tcp" else UdpSink)(parts.hostname, parts.port)
+    if spec.startswith("exec:"):
+        return ExecSink(spec[len("exec:"):])
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    raise ValueError(f"Destino de alarma desconocido: {spec}")
+
+
+def coalesce(events):
+    """
+    Merges a burst: events with the same (type, camera, zone) become the latest one,
+    with 'count' events since 'first_time'. Order follows the first occurrence.
+    """
+    merged = {}
+    for event in events:
+        key = (event.get('type'), event.get('camera'), event.get('zone'))
+        previous = merged.get(key)
+        if previous is None:
+            merged[key] = dict(event, count=event.get('count', 1), first_time=event.get('first_time', event.get('time')))
+        else:
+            merged[key] = dict(event, count=previous['count'] + event.get('count', 1), first_time=previous['first_time'])
+    return list(merged.values())
+
+
+class _SinkWorker:
+    """Per-sink queue of batches, so a slow or dead sink never delays the others."""
+    def __init__(self, sink, max_batches):
+        self.sink = sink
+        self.batches = deque(maxlen=max_batches) # Oldest batch dropped when full
+        self.wake = asyncio.Event()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+
+class AlarmDispatcher:
+    """
+    Delivers alarm events off the detection loop.
+    dispatch() only hands the event to an asyncio loop running in its own thread,
+    through a bounded queue (events are counted as dropped when it is full). The first
+    event after a quiet period goes out at once; while events keep coming, the loop
+    collects them for 'batch_window' seconds, coalesces the burst (see coalesce()) and
+    gives each sink its own copy of the batch. Every sink has its own worker that
+    retries with exponential backoff, so a slow webhook does not hold back the PLC.
+    Failures are reported through poll(), like ClipRecorder.
+    """
+    def __init__(self, sinks, max_queue=1000, batch_window=0.2, max_batch=50, retries=3, backoff=0.5,
+                 max_pending_batches=100):
+        self.sinks = list(sinks)
+        self.max_queue = max_queue
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.max_pending_batches = max_pending_batches
+        self.dispatched = 0
+        self.dropped = 0
+        self._results = deque()
+        self._pending = 0 # Events handed to the loop and not yet batched
+        self._lock = threading.Lock()
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="alarm-dispatcher", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    # --- Detection loop side ---
+
+    def dispatch(self, event):
+        """Queues one event (never blocks). Returns False if it was dropped."""
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._pending += 1
+        self.dispatched += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, dict(event))
+        return True
+
+    def poll(self):
+        """Returns the delivery failure reports since the last call."""
+        results = []
+        while self._results:
+            results.append(self._results.popleft())
+        return results
+
+    def get_stats(self):
+        return {
+            'dispatched': self.dispatched,
+            'dropped': self.dropped + sum(w.dropped for w in self._workers),
+            'sinks': {w.sink.name: {'sent': w.sent, 'failed': w.failed, 'pending': len(w.batches)} for w in self._workers},
+        }
+
+    def close(self, timeout=5.0):
+        """Delivers what is still queued (up to 'timeout' seconds) and stops the loop."""
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self._loop)
+        try:
+            future.result(timeout + 1.0)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2.0)
+
+    # --- Loop thread ---
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._workers = [_SinkWorker(sink, self.max_pending_batches) for sink in self.sinks]
+        self._tasks = [self._loop.create_task(self._collect())]
+        self._tasks += [self._loop.create_task(self._deliver(w)) for w in self._workers]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _collect(self):
+        last_batch = float("-inf")
+        while True:
+            batch = [await self._queue.get()]
+            now = self._loop.time()
+            # Quiet until now: no added latency, only take what is already queued
+            deadline = now + self.batch_window if now - last_batch < self.batch_window else now
+            while len(batch) < self.max_batch:
+                remaining = deadline - self._loop.time()
+                try:
+                    if remaining <= 0:
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+            last_batch = self._loop.time()
+            with self._lock:
+                self._pending -= len(batch)
+            batch = coalesce(batch)
+            for worker in self._workers:
+                if len(worker.batches) == worker.batches.maxlen:
+                    worker.dropped += len(worker.batches[0])
+                worker.batches.append(batch)
+                worker.wake.set()
+
+    async def _deliver(self, worker):
+        while True:
+            await worker.wake.wait()
+            worker.wake.clear()
+            while worker.batches:
+                batch = worker.batches[0]
+                error = None
+                for attempt in range(self.retries + 1):
+                    try:
+                        await worker.sink.send(batch)
+                        error = None
+                        break
+                    except Exception as e:
+                        error = e
+                        if attempt < self.retries:
+                            await asyncio.sleep(self.backoff * (2 ** attempt))
+                if worker.batches and worker.batches[0] is batch:
+                    worker.batches.popleft()
+                if error is None:
+                    worker.sent += len(batch)
+                else:
+                    worker.failed += len(batch)
+                    self._results.append({'type': 'ALARM_SINK_ERROR', 'sink': worker.sink.name,
+                                          'error': str(error) or type(error).__name__, 'events': len(batch)})
+
+    async def _shutdown(self, timeout):
+        deadline = self._loop.time() + timeout
+        # Let the collector batch what is queued, then let the workers drain
+        while self._loop.time() < deadline and (self._pending or not self._queue.empty()
+                                                or any(w.batches for w in self._workers)):
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        for worker in self._workers:
+            try:
+                await worker.sink.close()
+            except Exception:
+                pass
+
+
+async def _stand_in(port):
+    """Local stand-in receiver: prints what arrives by HTTP POST / TCP lines on 'port' and UDP on the same port."""
+    async def on_connection(reader, writer):
+        first = await reader.readline()
+        if first.startswith(b"POST"):
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            body = await reader.readexactly(length)
+            print(f"[HTTP] {body.decode('utf-8')}")
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        else:
+            line = first
+            while line:
+                print(f"[TCP] {line.decode('utf-8').strip()}")
+                line = await reader.readline()
+        writer.close()
+
+    class Datagrams(asyncio.DatagramProtocol):
+        def datagram_received(self, data, addr):
+            print(f"[UDP] {data.decode('utf-8')}")
+
+    loop = asyncio.get_running_loop()
+    await loop.create_datagram_endpoint(Datagrams, local_addr=("0.0.0.0", port))
+    server = await asyncio.start_server(on_connection, "0.0.0.0", port)
+    print(f"[INFO] Receptor de prueba en el puerto {port} (HTTP POST, TCP y UDP)")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    # python -m src.alarm_dispatcher [PORT]: stand-in receiver to test the sinks locally
+    try:
+        asyncio.run(_stand_in(int(sys.argv[1]) if len(sys.argv) > 1 else 9000))
+    except KeyboardInterrupt:
+        pass
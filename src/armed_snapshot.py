@@ -0,0 +1,96 @@
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"VSSNAP01"
+SNAPSHOT_NAME = "armed_state.snap"
+_ALIGN = 64 # Array offsets are aligned so the memory maps can be used directly
+
+def default_snapshot_path():
+    """Snapshot in the per-user state directory: %LOCALAPPDATA%/EXTRA on Windows, $XDG_STATE_HOME/extra (~/.local/state/extra) elsewhere."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "EXTRA", SNAPSHOT_NAME)
+    base = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(base, "extra", SNAPSHOT_NAME)
+
+def save_snapshot(path, state_manager, zone_manager, view=None):
+    """
+    Writes the armed state (settings, zones, reference frame and its blurred detection
+    image, optional view such as zoom/pan) to 'path'. Layout:
+        MAGIC | uint32 header length | JSON header | raw arrays (64-byte aligned)
+    The file is written next to 'path' and renamed, so a crash never leaves half a snapshot.
+    """
+    arrays = {'reference_frame': np.ascontiguousarray(state_manager.reference_frame),
+              'reference_gray': np.ascontiguousarray(state_manager.reference_gray)}
+    header = {
+        'saved': time.time(),
+        'settings': {name: getattr(state_manager, name) for name in state_manager.SETTINGS},
+        'zones': [z.tolist() for z in zone_manager.get_zones()],
+        'view': view or {},
+        'arrays': {},
+    }
+    # Offsets are relative to the data start (first aligned position after the header)
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'offset': offset, 'shape': list(array.shape), 'dtype': array.dtype.str}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    body = json.dumps(header).encode("utf-8")
+    start = -(-(len(MAGIC) + 4 + len(body)) // _ALIGN) * _ALIGN
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(body)))
+        f.write(body)
+        for name, array in arrays.items():
+            f.seek(start + header['arrays'][name]['offset'])
+            f.write(array.data)
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+
+def load_snapshot(path):
+    """
+    Reads a snapshot written by save_snapshot(). The arrays are read-only memory maps,
+    so loading costs only the header; the pixels are paged in when first used.
+    Returns the header dict with the arrays added, or None if there is no valid snapshot.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("formato desconocido")
+            (length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(length).decode("utf-8"))
+        start = -(-(len(MAGIC) + 4 + length) // _ALIGN) * _ALIGN
+        for name, info in header['arrays'].items():
+            header[name] = np.memmap(path, dtype=np.dtype(info['dtype']), mode="r",
+                                     offset=start + info['offset'], shape=tuple(info['shape']))
+        return header
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        print(f"[ERROR] Could not load snapshot {path}: {e}")
+        return None
+
+def apply_snapshot(snapshot, state_manager, zone_manager, copy=True, overrides=None):
+    """
+    Restores settings and zones, and arms from the saved reference.
+    overrides: settings applied over the saved ones (e.g. vars(args); None values are skipped).
+    copy=False keeps the memory maps, but then the file cannot be replaced on Windows while in use.
+    """
+    state_manager.apply_settings(snapshot['settings'])
+    if overrides is not None:
+        state_manager.apply_settings(overrides)
+    zone_manager.set_zones(snapshot['zones'])
+    frame, gray = snapshot['reference_frame'], snapshot['reference_gray']
+    if copy:
+        frame, gray = np.array(frame), np.array(gray)
+    state_manager.restore_hot(frame, gray)
+
+def remove_snapshot(path):
+    if os.path.exists(path):
+        os.remove(path)
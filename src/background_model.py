@@ -0,0 +1,117 @@
+import cv2
+import numpy as np
+
+BACKGROUND_MODES = ("static", "running_avg", "mog2", "knn")
+
+class StaticBackground:
+    """Single reference captured at HOT (original behaviour)."""
+    def __init__(self):
+        self.reference = None
+
+    def reset(self, gray):
+        self.reference = gray
+
+    def foreground(self, gray, region, threshold, dst=None):
+        """
+        Binary foreground (255) for 'gray', which covers region (x0, y0, x1, y1) of the frame.
+        dst: optional output image of gray's shape (see BufferPool).
+        """
+        x0, y0, x1, y1 = region
+        frame_delta = cv2.absdiff(self.reference[y0:y1, x0:x1], gray, dst=dst)
+        _, thresh = cv2.threshold(frame_delta, threshold, 255, cv2.THRESH_BINARY, dst=frame_delta)
+        return thresh
+
+    def update(self, gray, region, fg_mask):
+        pass
+
+
+class RunningAverageBackground(StaticBackground):
+    """
+    Running weighted average of the scene. Only background pixels are blended in
+    (foreground is masked out), and only every 'update_interval' frames, so slow
+    lighting drift is absorbed while people and objects are not.
+    """
+    def __init__(self, learning_rate=0.005, update_interval=5):
+        super().__init__()
+        self.learning_rate = learning_rate
+        self.update_interval = max(1, int(update_interval))
+        self.model = None
+        self.frame_count = 0
+        self._inverse = None # Reused background mask of update()
+
+    def reset(self, gray):
+        self.model = gray.astype(np.float32)
+        self.reference = gray.copy()
+        self.frame_count = 0
+
+    def update(self, gray, region, fg_mask):
+        self.frame_count += 1
+        if self.frame_count % self.update_interval != 0:
+            return
+        x0, y0, x1, y1 = region
+        model = self.model[y0:y1, x0:x1]
+        inverse = self._inverse if self._inverse is not None and self._inverse.shape == fg_mask.shape else None
+        self._inverse = cv2.bitwise_not(fg_mask, dst=inverse)
+        cv2.accumulateWeighted(gray, model, self.learning_rate, mask=self._inverse)
+        # Refresh the uint8 reference used by foreground(), in place
+        cv2.convertScaleAbs(model, dst=self.reference[y0:y1, x0:x1])
+
+
+class SubtractorBackground:
+    """
+    OpenCV MOG2 / KNN background subtractor. The model is per region, so it is
+    re-seeded from the HOT reference if the processed region changes.
+    Shadows (127) are treated as background.
+    """
+    def __init__(self, kind="mog2", learning_rate=0.005, update_interval=5):
+        self.kind = kind
+        self.learning_rate = learning_rate
+        self.update_interval = max(1, int(update_interval))
+        self.reference = None
+        self.subtractor = None
+        self.region = None
+        self.frame_count = 0
+
+    def reset(self, gray):
+        self.reference = gray
+        self.subtractor = None
+        self.region = None
+        self.frame_count = 0
+
+    def _create(self, region, threshold):
+        if self.kind == "knn":
+            self.subtractor = cv2.createBackgroundSubtractorKNN(detectShadows=True)
+        else:
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+        self._set_threshold(threshold)
+        x0, y0, x1, y1 = region
+        self.subtractor.apply(self.reference[y0:y1, x0:x1], learningRate=1.0)
+        self.region = region
+
+    def _set_threshold(self, threshold):
+        if self.kind == "knn":
+            self.subtractor.setDist2Threshold(float(threshold * threshold))
+        else:
+            self.subtractor.setVarThreshold(float(threshold))
+
+    def foreground(self, gray, region, threshold, dst=None):
+        if self.subtractor is None or self.region != region:
+            self._create(region, threshold)
+        else:
+            self._set_threshold(threshold)
+        self.frame_count += 1
+        rate = self.learning_rate if self.frame_count % self.update_interval == 0 else 0.0
+        fg = self.subtractor.apply(gray, fgmask=dst, learningRate=rate)
+        _, thresh = cv2.threshold(fg, 200, 255, cv2.THRESH_BINARY, dst=fg)
+        return thresh
+
+    def update(self, gray, region, fg_mask):
+        pass # Updated inside apply()
+
+
+def create_background_model(mode, learning_rate, update_interval):
+    if mode == "running_avg":
+        return RunningAverageBackground(learning_rate, update_interval)
+    if mode in ("mog2", "knn"):
+        return SubtractorBackground(mode, learning_rate, update_interval)
+    return StaticBackground()
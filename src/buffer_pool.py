@@ -0,0 +1,36 @@
+import numpy as np
+
+class BufferPool:
+    """
+    Named work arrays reused from frame to frame, so the hot loop does not allocate:
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=pool.get("gray", frame.shape[:2]))
+
+    Each name keeps one flat backing array; get() returns a view of it with the requested
+    shape, growing (reallocating) it only when a larger shape is asked for, i.e. when the
+    resolution or the zoom changes. When disabled, get() returns None, which OpenCV treats
+    as "allocate the output", so the same call sites work both ways.
+
+    A buffer is overwritten by the next get() of the same name: never keep it across frames.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._buffers = {}
+        self.allocations = 0 # Backing arrays (re)allocated so far
+
+    def get(self, name, shape, dtype=np.uint8):
+        if not self.enabled:
+            return None
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))
+        backing = self._buffers.get(name)
+        if backing is None or backing.dtype != dtype or backing.size < size:
+            backing = self._buffers[name] = np.empty(size, dtype=dtype)
+            self.allocations += 1
+        return backing[:size].reshape(shape)
+
+    def clear(self):
+        self._buffers.clear()
+
+    def nbytes(self):
+        return sum(b.nbytes for b in self._buffers.values())
@@ -1,14 +1,60 @@
 import cv2
+import threading
+import time
+from collections import deque, namedtuple
+
+from src.frame_sources import open_source
+
+# A captured frame plus its monotonic capture timestamp and sequence number
+FramePacket = namedtuple('FramePacket', ['frame', 'seq', 'timestamp'])
 
 class CameraManager:
-    def __init__(self, camera_id=0):
+    def __init__(self, camera_id=0, threaded=False, buffer_size=4, loop=False, realtime=None, open_async=False):
+        """
+        camera_id: device index, video file / URL, image folder or 'synthetic:WxH:N'.
+        loop: restart files and image folders when they end.
+        realtime: deliver non-device sources at their own fps (default: when threaded).
+        open_async: (threaded only) open the device in the capture thread, so the caller does
+            not wait for the driver and the resolution negotiation; see is_opening().
+        """
         self.camera_id = camera_id
+        self.loop = loop
+        self.realtime = threaded if realtime is None else realtime
         self.cap = None
-        self._initialize_camera(camera_id)
+        self.threaded = threaded
+        self.buffer_size = max(1, buffer_size)
+
+        # Threaded capture state
+        self._ring = deque(maxlen=self.buffer_size)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._read_ok = True
+        self._capture_seq = 0
+        self._last_seq = 0 # Last sequence handed to the consumer
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_duplicated = 0
+
+        self.opening = self.threaded and open_async
+        if not self.opening:
+            self._initialize_camera(camera_id)
+        if self.threaded:
+            self.start()
 
     def _initialize_camera(self, camera_id):
         if self.cap is not None:
             self.cap.release()
+
+        source = open_source(camera_id, realtime=self.realtime, loop=self.loop)
+        if source is not None:
+            print(f"[INFO] Opening source {camera_id}...")
+            self.cap = source
+            if not self.cap.isOpened():
+                print(f"[ERROR] Could not open source {camera_id}.")
+            return
+        if isinstance(camera_id, str):
+            camera_id = int(camera_id)
             
         print(f"[INFO] Attempting to open camera {camera_id}...")
         self.cap = cv2.VideoCapture(camera_id, cv2.CAP_DSHOW) # Use DSHOW on Windows for faster/better res switching
@@ -35,7 +81,142 @@ class CameraManager:
         actual_h = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
         print(f"[INFO] Resolution set to: {actual_w}x{actual_h}")
 
+    # --- Threaded Capture ---
+
+    def start(self):
+        """Starts the background capture thread (no-op if already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, name=f"capture-{self.camera_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background capture thread."""
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _capture_loop(self):
+        if self.opening:
+            try:
+                self._initialize_camera(self.camera_id)
+            finally:
+                self.opening = False
+            if not self._running and self.cap is not None:
+                self.cap.release() # Released while it was still opening
+        while self._running:
+            if not self.is_opened():
+                self._read_ok = False
+                time.sleep(0.1)
+                continue
+
+            if not self.is_live():
+                # Files and generators: wait for the consumer instead of dropping frames
+                with self._cond:
+                    self._cond.wait_for(lambda: not self._running or not self._ring_full(), 0.1)
+                if not self._running or self._ring_full():
+                    continue
+
+            ret, frame = self.cap.read()
+            timestamp = time.monotonic()
+
+            if not ret and self.is_finished():
+                # End of a file / image folder: nothing to reconnect to (buffered frames stay readable)
+                with self._cond:
+                    self._running = False
+                    self._cond.notify_all()
+                break
+
+            if not ret:
+                # Camera hiccup: flag it so the consumer sees "no signal" and can reconnect
+                with self._cond:
+                    self._read_ok = False
+                    self._cond.notify_all()
+                time.sleep(0.01)
+                continue
+
+            with self._cond:
+                self._capture_seq += 1
+                self.frames_captured += 1
+                self._ring.append(FramePacket(frame, self._capture_seq, timestamp))
+                self._read_ok = True
+                self._cond.notify_all()
+
+    def read_latest(self, timeout=0.0):
+        """
+        Returns the most recent FramePacket, or None if no frame is available.
+        If no new frame is ready, waits up to 'timeout' seconds for one (0 = do not block).
+        Frames captured but never handed out (sequence gaps) are counted as dropped;
+        returning the same frame twice is counted as a duplicate.
+        """
+        with self._cond:
+            if timeout > 0 and not self._has_new_frame():
+                self._cond.wait_for(lambda: not self._running or self._has_new_frame(), timeout)
+            if not self._read_ok or not self._ring:
+                return None
+            packet = self._ring[-1]
+            if packet.seq == self._last_seq:
+                self.frames_duplicated += 1
+            else:
+                self.frames_dropped += max(0, packet.seq - self._last_seq - 1)
+                self._last_seq = packet.seq
+                self._cond.notify_all()
+            return packet
+
+    def read_next(self, timeout=0.0):
+        """
+        Returns the oldest FramePacket not yet consumed, or None if nothing new
+        arrives within 'timeout' seconds (0 = do not block).
+        """
+        with self._cond:
+            if timeout > 0 and not self._has_new_frame():
+                self._cond.wait_for(lambda: not self._running or self._has_new_frame(), timeout)
+            if not self._read_ok:
+                return None
+            for packet in self._ring:
+                if packet.seq > self._last_seq:
+                    self.frames_dropped += max(0, packet.seq - self._last_seq - 1)
+                    self._last_seq = packet.seq
+                    self._cond.notify_all()
+                    return packet
+            return None
+
+    def _has_new_frame(self):
+        return bool(self._ring) and self._ring[-1].seq > self._last_seq
+
+    def _ring_full(self):
+        return bool(self._ring) and self._ring[-1].seq - self._last_seq >= self.buffer_size
+
+    def is_live(self):
+        """True for cameras (and paced sources): frames keep coming whether or not they are read."""
+        return getattr(self.cap, 'live', True)
+
+    def is_opening(self):
+        """True while an asynchronous open is still in progress."""
+        return self.opening
+
+    def is_finished(self):
+        """True once a non-looping file or image folder has been read to the end."""
+        return getattr(self.cap, 'ended', False)
+
+    def get_stats(self):
+        """Capture counters (only meaningful in threaded mode)."""
+        with self._cond:
+            return {
+                'captured': self.frames_captured,
+                'dropped': self.frames_dropped,
+                'duplicated': self.frames_duplicated,
+                'last_seq': self._last_seq,
+            }
+
     def read_frame(self):
+        if self.threaded:
+            packet = self.read_latest()
+            return packet.frame if packet is not None else None
         if not self.is_opened():
             return None
         ret, frame = self.cap.read()
@@ -44,6 +225,8 @@ class CameraManager:
         return frame
 
     def release(self):
+        if self.threaded:
+            self.stop()
         if self.cap:
              self.cap.release()
 
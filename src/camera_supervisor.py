@@ -0,0 +1,180 @@
+import cv2
+import multiprocessing as mp
+import queue
+import time
+
+from src.camera_manager import CameraManager
+from src.zone_manager import ZoneManager
+from src.state_manager import StateManager
+from src.detection_pipeline import DetectionPipeline
+from src.detection_scheduler import DetectionScheduler
+
+def camera_worker(cam_index, config, event_queue, preview_queue, command_queue, stop_event):
+    """
+    Detection worker for one camera. Runs in its own process with its own
+    zones, reference frame and thresholds. Sends back:
+        ('event', cam_index, info)   - intrusion rising edges and state changes
+        ('preview', cam_index, info) - low-rate JPEG previews (dropped if the UI is slow)
+    """
+    camera = CameraManager(config['source'], threaded=True, loop=config.get('loop', False))
+    zone_manager = ZoneManager()
+    zone_manager.load_zones(config['zones'])
+    state_manager = StateManager()
+    state_manager.apply_settings(config)
+    pipeline = DetectionPipeline(state_manager, zone_manager, scheduler=DetectionScheduler.from_settings(config))
+
+    preview_interval = 1.0 / max(0.1, config.get('preview_fps', 2.0))
+    preview_width = config.get('preview_width', 320)
+    arm_after = config.get('arm_after', 0) # Auto-arm after N frames (0 = wait for command)
+
+    last_seq = 0
+    frames_seen = 0
+    frames_processed = 0
+    last_preview_time = 0.0
+    stats_time = time.monotonic()
+    fps = 0.0
+    result = None
+
+    event_queue.put(('event', cam_index, {'type': 'STARTED', 'source': config['source'], 'zones': len(zone_manager.get_zones())}))
+
+    while not stop_event.is_set():
+        # 1. Commands from the UI process
+        try:
+            while True:
+                cmd = command_queue.get_nowait()
+                if cmd['action'] == 'SET_HOT':
+                    arm_after = frames_seen + 1 # Arm (or recapture the reference, if HOT) on the next frame
+                elif cmd['action'] == 'SET_COLD':
+                    arm_after = 0 # A pending arming must not undo the disarm
+                    state_manager.set_cold()
+                    pipeline.reset()
+                    event_queue.put(('event', cam_index, {'type': 'COLD'}))
+                elif cmd['action'] == 'STOP':
+                    stop_event.set()
+        except queue.Empty:
+            pass
+
+        # 2. Capture
+        packet = camera.read_latest(timeout=0.1)
+        if packet is None or packet.seq == last_seq:
+            continue
+        last_seq = packet.seq
+        frames_seen += 1
+        frame = packet.frame
+
+        if arm_after and frames_seen >= arm_after:
+            state_manager.set_hot(frame)
+            pipeline.reset()
+            arm_after = 0
+            event_queue.put(('event', cam_index, {'type': 'HOT'}))
+
+        # 3. Detection
+        if state_manager.is_hot():
+            result = pipeline.process(frame, timestamp=packet.timestamp)
+            frames_processed += 1
+            if result['new_intrusion']:
+                event_queue.put(('event', cam_index, {
+                    'type': 'INTRUSION',
+                    'time': time.time(),
+                    'intrusions': state_manager.intrusions,
+                    'zones': result['zones_hit'],
+                    'area': float(max(result['areas'])) if result['areas'] else None,
+                    'seq': packet.seq,
+                    'tracks': [e['track'] for e in result['events'] if e['type'] == 'ENTER'],
+                }))
+            for track_event in result['events']:
+                if track_event['type'] == 'EXIT':
+                    event_queue.put(('event', cam_index, dict(track_event, type='TRACK_EXIT', seq=packet.seq)))
+        else:
+            result = None
+
+        now = time.monotonic()
+        if now - stats_time >= 1.0:
+            fps = frames_processed / (now - stats_time)
+            frames_processed = 0
+            stats_time = now
+
+        # 4. Low-rate preview
+        if now - last_preview_time >= preview_interval:
+            last_preview_time = now
+            h, w = frame.shape[:2]
+            scale = preview_width / w
+            preview = cv2.resize(frame, (preview_width, int(h * scale)), interpolation=cv2.INTER_AREA)
+            if result is not None and len(result['blobs']):
+                cv2.polylines(preview, list((result['blobs'].corners() * scale).astype('int32')), True, (0, 255, 0), 1)
+            for zone in zone_manager.get_zones():
+                cv2.polylines(preview, [(zone * scale).astype('int32')], True, (0, 0, 255), 1)
+            ok, jpeg = cv2.imencode('.jpg', preview, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            if ok:
+                try:
+                    preview_queue.put_nowait(('preview', cam_index, {
+                        'jpeg': jpeg.tobytes(),
+                        'hot': state_manager.is_hot(),
+                        'intrusion': bool(result and result['intrusion']),
+                        'intrusions': state_manager.intrusions,
+                        'fps': fps,
+                    }))
+                except queue.Full:
+                    pass # UI is behind; drop this preview
+
+    camera.release()
+    event_queue.put(('event', cam_index, {'type': 'STOPPED'}))
+    # Do not block process exit on messages the UI will never read
+    event_queue.cancel_join_thread()
+    preview_queue.cancel_join_thread()
+
+
+class CameraSupervisor:
+    """Starts and supervises one detection worker process per camera source."""
+
+    def __init__(self, camera_configs, preview_queue_size=16):
+        # camera_configs: list of dicts with 'source' and 'zones' (+ optional threshold, min_area, arm_after, preview_fps)
+        self.camera_configs = camera_configs
+        self.ctx = mp.get_context("spawn") # Same behaviour on Windows and Linux
+        self.event_queue = self.ctx.Queue()
+        self.preview_queue = self.ctx.Queue(maxsize=preview_queue_size)
+        self.stop_event = self.ctx.Event()
+        self.command_queues = []
+        self.workers = []
+
+    def start(self):
+        for i, config in enumerate(self.camera_configs):
+            cmd_q = self.ctx.Queue()
+            proc = self.ctx.Process(
+                target=camera_worker,
+                args=(i, config, self.event_queue, self.preview_queue, cmd_q, self.stop_event),
+                name=f"camera-worker-{i}",
+                daemon=True,
+            )
+            proc.start()
+            self.command_queues.append(cmd_q)
+            self.workers.append(proc)
+        print(f"[INFO] Started {len(self.workers)} camera workers")
+
+    def send(self, cam_index, command):
+        """Sends a command dict to one camera (cam_index=None for all)."""
+        targets = range(len(self.command_queues)) if cam_index is None else [cam_index]
+        for i in targets:
+            self.command_queues[i].put(command)
+
+    def poll(self, max_messages=64):
+        """Returns pending (kind, cam_index, info) messages without blocking. Events come first."""
+        messages = []
+        for q in (self.event_queue, self.preview_queue):
+            while len(messages) < max_messages:
+                try:
+                    messages.append(q.get_nowait())
+                except queue.Empty:
+                    break
+        return messages
+
+    def alive(self):
+        return [p.is_alive() for p in self.workers]
+
+    def stop(self, timeout=3.0):
+        self.stop_event.set()
+        for proc in self.workers:
+            proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.terminate()
+        print("[INFO] Camera workers stopped")
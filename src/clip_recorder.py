@@ -0,0 +1,212 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+class _Clip:
+    """One alarm clip: frames [start, end) of the ring counter. 'end' is None while still recording."""
+    def __init__(self, start, end_time, info, snapshot):
+        self.start = start
+        self.end = None
+        self.end_time = end_time
+        self.info = info
+        self.snapshot = snapshot
+
+
+class ClipRecorder:
+    """
+    Pre/post-alarm recorder.
+    The detection loop calls add_frame() for every camera frame; frames are sampled at
+    'fps', scaled by 'scale' and written into a preallocated ring (no per-frame allocation).
+    trigger() starts a clip with the last 'pre_seconds' of the ring and keeps it open for
+    'post_seconds' after the last trigger. A background thread encodes clips as the frames
+    arrive and writes a JPEG snapshot of the triggering frame.
+
+    Nothing here blocks the caller: if the encoder falls behind, overwritten ring slots are
+    detected by their sequence numbers and counted as lost frames, and clips that do not fit
+    in the job queue are dropped and reported. Results are collected with poll().
+    """
+    def __init__(self, output_dir="clips", pre_seconds=5.0, post_seconds=5.0, fps=10.0, scale=0.5,
+                 max_pending=2, codec="mp4v", extension=".mp4"):
+        self.output_dir = output_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.fps = fps
+        self.scale = scale
+        self.codec = codec
+        self.extension = extension
+
+        # Pre-alarm frames plus slack for the encoder to catch up
+        self.pre_frames = int(np.ceil(pre_seconds * fps))
+        self.capacity = self.pre_frames + int(np.ceil(2 * fps)) + 1
+        self._ring = None       # (capacity, h, w, 3) uint8, allocated on the first frame
+        self._ring_seq = None   # Counter value stored in each slot (-1 while being written)
+        self._written = 0       # Frames written to the ring so far
+        self._last_sample = None
+        self._cond = threading.Condition()
+
+        self._active = None
+        self._jobs = queue.Queue(maxsize=max_pending)
+        self._results = deque()
+        self.clips_written = 0
+        self.clips_dropped = 0
+        self.frames_lost = 0
+
+        os.makedirs(output_dir, exist_ok=True)
+        self._running = True
+        self._thread = threading.Thread(target=self._encode_loop, name="clip-encoder", daemon=True)
+        self._thread.start()
+
+    # --- Detection loop side ---
+
+    def add_frame(self, frame, timestamp=None):
+        """Samples 'frame' into the ring (at most 'fps' times per second)."""
+        now = time.monotonic() if timestamp is None else timestamp
+        if self._last_sample is not None and now - self._last_sample < 1.0 / self.fps:
+            self._check_end(now)
+            return
+        self._last_sample = now
+
+        h, w = frame.shape[:2]
+        size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+        if self._ring is None or self._ring.shape[1:3] != (size[1], size[0]):
+            if self._active is not None:
+                self._close(now) # Resolution change: finish the current clip
+            with self._cond:
+                self._ring = np.empty((self.capacity, size[1], size[0], 3), dtype=np.uint8)
+                self._ring_seq = np.full(self.capacity, -1, dtype=np.int64)
+                self._written = 0
+
+        count = self._written
+        slot = count % self.capacity
+        self._ring_seq[slot] = -1
+        if size == (w, h):
+            np.copyto(self._ring[slot], frame)
+        else:
+            cv2.resize(frame, size, dst=self._ring[slot], interpolation=cv2.INTER_AREA)
+        self._ring_seq[slot] = count
+        with self._cond:
+            self._written = count + 1
+            self._cond.notify_all()
+        self._check_end(now)
+
+    def trigger(self, frame=None, info=None):
+        """
+        Starts a clip (or extends the open one by 'post_seconds').
+        Returns False if the clip had to be dropped because the encoder is saturated.
+        """
+        now = time.monotonic()
+        if self._active is not None:
+            self._active.end_time = now + self.post_seconds
+            return True
+        if self._ring is None:
+            return False
+
+        snapshot = frame.copy() if frame is not None else None
+        clip = _Clip(max(0, self._written - self.pre_frames), now + self.post_seconds, dict(info or {}), snapshot)
+        try:
+            self._jobs.put_nowait(clip)
+        except queue.Full:
+            self.clips_dropped += 1
+            self._results.append({'type': 'CLIP_DROPPED', 'info': clip.info, 'pending': self._jobs.qsize()})
+            return False
+        self._active = clip
+        return True
+
+    def _check_end(self, now):
+        if self._active is not None and now >= self._active.end_time:
+            self._close(now)
+
+    def _close(self, now):
+        with self._cond:
+            self._active.end = self._written
+            self._active = None
+            self._cond.notify_all()
+
+    def poll(self):
+        """Returns the finished / dropped clip reports since the last call."""
+        results = []
+        while self._results:
+            results.append(self._results.popleft())
+        return results
+
+    def get_stats(self):
+        return {
+            'written': self.clips_written,
+            'dropped': self.clips_dropped,
+            'lost_frames': self.frames_lost,
+            'pending': self._jobs.qsize(),
+            'recording': self._active is not None,
+        }
+
+    def close(self, timeout=5.0):
+        """Finishes the open clip and waits (up to 'timeout') for the encoder."""
+        if self._active is not None:
+            self._close(time.monotonic())
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    # --- Encoder thread ---
+
+    def _encode_loop(self):
+        while self._running or not self._jobs.empty():
+            try:
+                clip = self._jobs.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            self._encode(clip)
+
+    def _encode(self, clip):
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.output_dir, f"alarma_{stamp}_{clip.start}")
+        report = {'type': 'CLIP', 'info': clip.info, 'path': base + self.extension, 'snapshot': None}
+        if clip.snapshot is not None:
+            cv2.imwrite(base + ".jpg", clip.snapshot)
+            report['snapshot'] = base + ".jpg"
+            clip.snapshot = None
+
+        ring = self._ring
+        frame = np.empty(ring.shape[1:], dtype=np.uint8) # Encoder-owned copy of one slot
+        writer = cv2.VideoWriter(report['path'], cv2.VideoWriter_fourcc(*self.codec), self.fps, (ring.shape[2], ring.shape[1]))
+        count = clip.start
+        frames = lost = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: count < self._written or clip.end is not None or self._ring is not ring, 0.5)
+                if self._ring is not ring:
+                    break # Ring reallocated (resolution change)
+                if clip.end is not None and count >= clip.end:
+                    break
+                if count >= self._written:
+                    continue
+                if self._written - count > self.capacity:
+                    # Fell behind: those slots were already overwritten
+                    skipped = self._written - count - self.capacity + 1
+                    lost += skipped
+                    count += skipped
+            slot = count % self.capacity
+            if self._ring_seq[slot] != count:
+                lost += 1
+                count += 1
+                continue
+            np.copyto(frame, ring[slot])
+            if self._ring_seq[slot] != count:
+                # Overwritten while copying
+                lost += 1
+                count += 1
+                continue
+            writer.write(frame)
+            frames += 1
+            count += 1
+        writer.release()
+
+        self.clips_written += 1
+        self.frames_lost += lost
+        report.update({'frames': frames, 'lost': lost, 'seconds': frames / self.fps})
+        self._results.append(report)
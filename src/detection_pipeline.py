@@ -0,0 +1,153 @@
+import numpy as np
+
+from src.blobs import Blobs
+from src.tracker import CentroidTracker
+
+class DetectionPipeline:
+    """
+    Frame -> blobs -> zone check -> tracks -> intrusion status.
+    Shared by the dashboard loop and the per-camera workers so both apply the same logic.
+    With tracking (default) every track entering a zone is one intrusion, however often
+    its blob flickers; without it, intrusions are rising edges of "any blob in a zone".
+    An optional DetectionScheduler skips frames (motion gate / detection rate); a skipped
+    frame returns the last result again, without new events.
+    """
+    def __init__(self, state_manager, zone_manager, min_overlap=None, track=True, scheduler=None):
+        self.state_manager = state_manager
+        self.zone_manager = zone_manager
+        # None = a blob counts in the zone holding most of its pixels if more than min_area of
+        # them are inside it. Decided on in-zone pixels only, so zone-only detection (blobs
+        # clipped to the zones) raises the same alarms as the full frame.
+        # 0..1 = a blob counts if at least this fraction of its pixels is in a zone.
+        self.min_overlap = min_overlap
+        self.tracker = CentroidTracker() if track else None
+        self.scheduler = scheduler
+        self._last_result = None
+
+    def reset(self):
+        """Forgets the tracks (no EXIT events) and the scheduler's last detection; call when the system is armed or disarmed."""
+        if self.tracker is not None:
+            self.tracker.reset()
+        if self.scheduler is not None:
+            self.scheduler.reset() # The next frame is always detected
+        self._last_result = None
+
+    def process(self, frame, offset=(0, 0), camera_size=None, timestamp=None, valid=None):
+        """
+        Runs detection on 'frame' (which may be a crop of the camera image starting at 'offset').
+        camera_size (w, h) sizes the zone raster; defaults to the frame size plus offset.
+        Returns a dict with:
+            blobs: Blobs (areas, bboxes, centroids in frame space)
+            hit_mask: (N,) bool, blobs inside a zone
+            hits: centroids (frame space, int) of blobs inside a zone
+            areas: pixel area of each hit blob
+            zones_hit: sorted ids of the zones that were hit
+            intrusion: True if any blob is inside a zone
+            new_intrusion: True when the intrusion counter was incremented
+            events: tracker ENTER / EXIT events (see CentroidTracker)
+            tracks: (ids, positions in frame space, zones) of the confirmed tracks
+            detected: False if the scheduler skipped this frame (the rest is the last result)
+        timestamp: monotonic capture time (for dwell times), defaults to now.
+        valid: optional callable, checked once detection has read the frame; if it returns
+        False (e.g. the shared slot was overwritten meanwhile) the result is discarded before
+        the zone check and tracker, and None is returned.
+        """
+        state = self.state_manager
+        if not state.is_hot():
+            self.reset()
+            return {'blobs': Blobs.empty(), 'hit_mask': np.zeros(0, dtype=bool), 'hits': [], 'areas': [],
+                    'zones_hit': [], 'intrusion': False, 'new_intrusion': False, 'events': [],
+                    'tracks': (np.zeros(0, dtype=np.int64), np.zeros((0, 2)), np.zeros(0, dtype=np.int64)),
+                    'detected': False}
+
+        if self.scheduler is not None:
+            # The first frame after a reset is always detected, so there is a last result to reuse
+            with state.profiler.span("gate"):
+                run = self.scheduler.should_detect(frame, timestamp)
+            if not run:
+                return dict(self._last_result, new_intrusion=False, events=[], detected=False)
+
+        if camera_size is None:
+            h, w = frame.shape[:2]
+            camera_size = (w + offset[0], h + offset[1])
+
+        if state.zone_restricted:
+            blobs = self._detect_in_zones(frame, offset, camera_size)
+        else:
+            blobs = state.detect_blobs(frame)
+        if valid is not None and not valid():
+            return None
+
+        with state.profiler.span("zones"):
+            if len(blobs) == 0:
+                ids = np.zeros(0, dtype=np.int64)
+            elif self.min_overlap is None:
+                inside = self.zone_manager.blobs_zone_pixels(blobs, offset, camera_size)[:, 1:]
+                best = inside.argmax(axis=1)
+                ids = np.where(inside[np.arange(len(blobs)), best] > state.min_area, best + 1, 0)
+            else:
+                # Zone with the largest share of the blob, if it reaches min_overlap
+                overlap = self.zone_manager.blobs_zone_overlap(blobs, offset, camera_size)[:, 1:]
+                best = overlap.argmax(axis=1)
+                share = overlap[np.arange(len(blobs)), best]
+                ids = np.where((share > 0) & (share >= self.min_overlap), best + 1, 0)
+            hit_mask = ids > 0
+            zones_hit = np.unique(ids[hit_mask]).tolist()
+            hits = [tuple(p) for p in blobs.centroids[hit_mask].astype(np.int64).tolist()]
+            areas = blobs.areas[hit_mask].tolist()
+
+        previous_count = state.intrusions
+        if self.tracker is None:
+            events = []
+            tracks = (np.zeros(0, dtype=np.int64), np.zeros((0, 2)), np.zeros(0, dtype=np.int64))
+            state.update_intrusion_status(len(hits) > 0)
+            intrusion = len(hits) > 0
+        else:
+            with state.profiler.span("tracking"):
+                # Tracks live in Camera Space so panning does not break them
+                events = self.tracker.update(blobs.centroids + np.array(offset), ids, blobs.areas, timestamp)
+                entered = sum(1 for e in events if e['type'] == 'ENTER')
+                intrusion = self.tracker.in_zone()
+                state.register_intrusions(entered, intrusion)
+                track_ids, positions, track_zones = self.tracker.active()
+                tracks = (track_ids, positions - np.array(offset), track_zones)
+
+        if self.scheduler is not None:
+            # Keep detecting every frame while anything is in view or still tracked
+            self.scheduler.detected(len(blobs) > 0 or (self.tracker is not None and len(self.tracker.ids) > 0))
+
+        self._last_result = {
+            'blobs': blobs,
+            'hit_mask': hit_mask,
+            'hits': hits,
+            'areas': areas,
+            'zones_hit': zones_hit,
+            'intrusion': intrusion,
+            'new_intrusion': state.intrusions > previous_count,
+            'events': events,
+            'tracks': tracks,
+            'detected': True,
+        }
+        return self._last_result
+
+    def _detect_in_zones(self, frame, offset, camera_size):
+        """
+        Runs detection only on the zones' bounding box, masked to the zone pixels. The hit
+        rule only counts in-zone pixels, so the alarms match the full-frame path.
+        """
+        bbox = self.zone_manager.get_zones_bbox()
+        if bbox is None:
+            return Blobs.empty() # No zones: nothing can raise an alarm
+
+        # Zone box and mask from Camera Space to Frame (Crop) Space
+        h, w = frame.shape[:2]
+        ox, oy = offset
+        x0 = max(0, bbox[0] - ox)
+        y0 = max(0, bbox[1] - oy)
+        x1 = min(w, bbox[0] + bbox[2] - ox)
+        y1 = min(h, bbox[1] + bbox[3] - oy)
+        if x1 <= x0 or y1 <= y0:
+            return Blobs.empty() # Zones are outside the current view
+
+        mask = self.zone_manager.get_zone_mask(camera_size[0], camera_size[1])[oy:oy+h, ox:ox+w]
+        return self.state_manager.detect_blobs(frame, roi=(x0, y0, x1 - x0, y1 - y0), mask=mask)
@@ -0,0 +1,278 @@
+import multiprocessing as mp
+import queue
+import time
+
+import numpy as np
+
+from src.blobs import Blobs
+from src.detection_pipeline import DetectionPipeline
+from src.detection_scheduler import DetectionScheduler
+from src.frame_bus import BusCamera, FrameRing, capture_worker
+from src.profiler import StageProfiler
+from src.state_manager import StateManager
+from src.zone_manager import ZoneManager
+
+def _empty_result():
+    return {'blobs': Blobs.empty(), 'hit_mask': np.zeros(0, dtype=bool), 'hits': [], 'areas': [],
+            'zones_hit': [], 'intrusion': False, 'new_intrusion': False, 'events': [],
+            'tracks': (np.zeros(0, dtype=np.int64), np.zeros((0, 2)), np.zeros(0, dtype=np.int64)),
+            'detected': False}
+
+def detection_worker(ring_queue, config, command_queue, result_queue, event_queue, stop_event):
+    """
+    Detection process: newest frame of the ring -> DetectionPipeline -> metadata.
+    The frame is used in place (a view of the shared slot) and only the small part of the
+    result travels back. Results with events (intrusions, track exits) go to event_queue
+    and are never dropped; the others go to result_queue and are dropped if the dashboard
+    is behind. Commands: ARM (reference frame), COLD, SETTINGS and ZONES.
+    The ring is attached once the capture process sends its name on 'ring_queue'.
+    """
+    ring = None
+    state_manager = StateManager()
+    zone_manager = ZoneManager()
+    profiler = StageProfiler(enabled=config.get('profile', True))
+    state_manager.profiler = profiler
+    state_manager.buffers.enabled = config.get('buffer_pool', True)
+    scheduler = DetectionScheduler.from_settings(config)
+    pipeline = DetectionPipeline(state_manager, zone_manager, scheduler=scheduler)
+
+    epoch = 0         # Arming generation, so the dashboard can ignore results of an older one
+    last_seq = 0
+    torn = 0          # Frames overwritten by the capture process while being detected
+    stats_time = time.monotonic()
+
+    while not stop_event.is_set():
+        # 1. Commands from the dashboard
+        try:
+            while True:
+                cmd = command_queue.get_nowait()
+                action = cmd['action']
+                if action == 'ARM':
+                    epoch = cmd['epoch']
+                    state_manager.set_hot(cmd['reference'])
+                    pipeline.reset()
+                elif action == 'COLD':
+                    epoch = cmd['epoch']
+                    state_manager.set_cold()
+                    pipeline.reset()
+                elif action == 'SETTINGS':
+                    settings = cmd['settings']
+                    background_mode, downscale = settings.pop('background_mode'), settings.pop('detection_downscale')
+                    state_manager.apply_settings(settings)
+                    if background_mode != state_manager.background_mode:
+                        state_manager.set_background_mode(background_mode)
+                    if downscale != state_manager.detection_downscale:
+                        state_manager.set_detection_downscale(downscale)
+                elif action == 'ZONES':
+                    zone_manager.set_zones(cmd['zones'])
+        except queue.Empty:
+            pass
+
+        # 2. Newest frame (older ones are skipped: detection never throttles capture)
+        if ring is None:
+            try:
+                ring = FrameRing.attach(ring_queue.get(timeout=0.05))
+            except queue.Empty:
+                continue
+        seq = ring.wait_next(last_seq, 0.05)
+        if seq is None:
+            continue
+        last_seq = seq
+        if not state_manager.is_hot():
+            continue
+        item = ring.read(seq)
+        if item is None:
+            continue
+        frame, seq, timestamp = item
+
+        # 3. Detection on the whole camera frame, in place
+        start = time.perf_counter_ns()
+        # A frame overwritten by the capture process while being read is dropped before it
+        # reaches the tracker, so a frame-bus race can never raise an alarm
+        result = pipeline.process(frame, timestamp=timestamp, valid=lambda: ring.valid(seq))
+        if result is None:
+            torn += 1
+        if profiler.enabled:
+            profiler.record("frame", time.perf_counter_ns() - start)
+
+        message = None
+        if result is not None and result['detected']:
+            blobs = result['blobs']
+            message = {
+                'epoch': epoch, 'seq': seq,
+                'blob_areas': blobs.areas, 'blob_bboxes': blobs.bboxes, 'blob_centroids': blobs.centroids,
+                'hit_mask': result['hit_mask'], 'hits': result['hits'], 'areas': result['areas'],
+                'zones_hit': result['zones_hit'], 'intrusion': result['intrusion'],
+                'new_intrusion': result['new_intrusion'], 'events': result['events'],
+                'tracks': result['tracks'], 'intrusions': state_manager.intrusions,
+            }
+        now = time.monotonic()
+        if now - stats_time >= 1.0:
+            stats_time = now
+            message = message or {'epoch': epoch, 'seq': None}
+            message.update(perf=profiler.summary() if profiler.enabled else None,
+                           detect_stats=scheduler.get_stats(), torn=torn)
+        if message is None:
+            continue
+        if message.get('new_intrusion') or message.get('events'):
+            event_queue.put(message)
+        else:
+            try:
+                result_queue.put_nowait(message)
+            except queue.Full:
+                pass # Dashboard is behind; it only needs the newest result
+
+    if ring is not None:
+        ring.close()
+    # Do not block process exit on messages the dashboard will never read
+    event_queue.cancel_join_thread()
+    result_queue.cancel_join_thread()
+
+
+class RemotePipeline:
+    """
+    DetectionPipeline stand-in for the dashboard when detection runs in its own process.
+    sync() forwards arming, settings and zones of the local StateManager / ZoneManager to
+    the detection process and collects its results (intrusion counter included);
+    process() returns the newest result in the form of DetectionPipeline.process()
+    (blobs without label image).
+    """
+    def __init__(self, state_manager, zone_manager, command_queue, result_queue, event_queue):
+        self.state_manager = state_manager
+        self.zone_manager = zone_manager
+        self.command_queue = command_queue
+        self.result_queue = result_queue
+        self.event_queue = event_queue
+        self._epoch = 0
+        self._armed_reference = None
+        self._settings = None
+        self._zones_version = None
+        self._latest = None
+        self._new_intrusion = False
+        self._events = []
+        self._fresh = False
+        self.perf = None
+        self.detect_stats = {'runs': 0, 'checks': 0}
+        self.torn = 0
+
+    def sync(self):
+        """Call once per dashboard loop, before process()."""
+        state = self.state_manager
+        settings = {name: getattr(state, name) for name in StateManager.SETTINGS}
+        if settings != self._settings:
+            self._settings = settings
+            self.command_queue.put({'action': 'SETTINGS', 'settings': settings})
+        if self.zone_manager.version != self._zones_version:
+            self._zones_version = self.zone_manager.version
+            self.command_queue.put({'action': 'ZONES', 'zones': [z.tolist() for z in self.zone_manager.get_zones()]})
+
+        if state.is_hot() and state.reference_frame is not self._armed_reference:
+            # The reference is the only image ever sent through a queue, once per arming
+            self._rearm()
+            self._armed_reference = state.reference_frame
+            self.command_queue.put({'action': 'ARM', 'epoch': self._epoch,
+                                    'reference': np.ascontiguousarray(state.reference_frame)})
+        elif not state.is_hot() and self._armed_reference is not None:
+            self._rearm()
+            self._armed_reference = None
+            self.command_queue.put({'action': 'COLD', 'epoch': self._epoch})
+        self._drain()
+
+    def reset(self):
+        """The detection process resets its own pipeline on the ARM / COLD commands sent by sync()."""
+        self._rearm()
+
+    def _rearm(self):
+        self._epoch += 1
+        self._latest = None
+        self._new_intrusion = False
+        self._events = []
+
+    def _drain(self):
+        for q in (self.event_queue, self.result_queue):
+            while True:
+                try:
+                    self._receive(q.get_nowait())
+                except queue.Empty:
+                    break
+
+    def _receive(self, message):
+        if 'detect_stats' in message:
+            self.perf, self.detect_stats, self.torn = message['perf'], message['detect_stats'], message['torn']
+        if message['epoch'] != self._epoch or message['seq'] is None:
+            return
+        self._new_intrusion |= message['new_intrusion']
+        self._events.extend(message['events'])
+        if self._latest is None or message['seq'] >= self._latest['seq']:
+            self._latest = message
+            self._fresh = True
+            self.state_manager.intrusions = message['intrusions']
+            self.state_manager.intrusion_active = message['intrusion']
+
+    def process(self, frame=None, offset=(0, 0), camera_size=None, timestamp=None):
+        """Newest result of the detection process (which always detects on the whole camera frame)."""
+        self._drain()
+        message = self._latest
+        if message is None or not self.state_manager.is_hot():
+            return _empty_result()
+        result = {
+            'blobs': Blobs(message['blob_areas'], message['blob_bboxes'], message['blob_centroids']),
+            'hit_mask': message['hit_mask'],
+            'hits': message['hits'],
+            'areas': message['areas'],
+            'zones_hit': message['zones_hit'],
+            'intrusion': message['intrusion'],
+            'new_intrusion': self._new_intrusion,
+            'events': self._events,
+            'tracks': message['tracks'],
+            'detected': self._fresh,
+        }
+        self._new_intrusion = False
+        self._events = []
+        self._fresh = False
+        return result
+
+
+class SplitProcesses:
+    """
+    Capture, detection and dashboard in separate processes (--multiprocess):
+        capture process     camera -> FrameRing (shared memory)
+        detection process   newest ring frame -> DetectionPipeline -> metadata queues
+        this process        ring -> dashboard (BusCamera), results through RemotePipeline
+    Frames are never pickled or copied between processes; only commands and detection
+    metadata cross the queues, so each stage runs at its own rate. The ring slots are
+    sized from the first camera frame, so every process works in camera pixels.
+    """
+    def __init__(self, source, loop=False, config=None, slots=6):
+        self.ctx = mp.get_context("spawn") # Same behaviour on Windows and Linux
+        self.ring_queues = (self.ctx.Queue(), self.ctx.Queue()) # Ring name to the dashboard / detection
+        self.stop_event = self.ctx.Event()
+        self.command_queue = self.ctx.Queue()
+        self.result_queue = self.ctx.Queue(maxsize=8)
+        self.event_queue = self.ctx.Queue()
+        self.processes = [
+            self.ctx.Process(target=capture_worker, args=(source, loop, slots, self.ring_queues, self.stop_event),
+                             name="capture", daemon=True),
+            self.ctx.Process(target=detection_worker,
+                             args=(self.ring_queues[1], config or {}, self.command_queue, self.result_queue,
+                                   self.event_queue, self.stop_event),
+                             name="detection", daemon=True),
+        ]
+        for proc in self.processes:
+            proc.start()
+        self.camera = BusCamera(self.ring_queues[0], source, loop, on_release=self.stop)
+        print("[INFO] Started capture and detection processes")
+
+    def create_pipeline(self, state_manager, zone_manager):
+        return RemotePipeline(state_manager, zone_manager, self.command_queue, self.result_queue, self.event_queue)
+
+    def alive(self):
+        return [p.is_alive() for p in self.processes]
+
+    def stop(self, timeout=3.0):
+        self.stop_event.set()
+        for proc in self.processes:
+            proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.terminate()
+        print("[INFO] Capture and detection processes stopped")
@@ -0,0 +1,113 @@
+import time
+
+import cv2
+import numpy as np
+
+class DetectionScheduler:
+    """
+    Decides, frame by frame, whether the full detection pipeline has to run.
+
+    - Rate: at most 'detect_fps' detections per second (0 = every frame), independent
+      of the capture and display rates.
+    - Motion gate: a tiny grayscale thumbnail of the frame is compared with the one of
+      the last full detection; if no thumbnail pixel changed by more than 'gate_threshold'
+      the frame is skipped. A full detection still runs every 'max_interval' seconds,
+      and on every eligible frame while the last detection found something (so a person
+      standing still, or a track waiting to expire, keeps being followed).
+
+    The thumbnail is built from a nearest-neighbour sample at twice its size, averaged
+    down (a full-frame INTER_AREA costs over ten times more), so a quiet scene costs a
+    small fraction of a full detection, and the first frame with motion is detected at once.
+    """
+    # Settings that can be given on the command line / in a worker config
+    SETTINGS = ("detect_fps", "max_detect_interval", "motion_gate")
+
+    def __init__(self, detect_fps=0.0, max_interval=1.0, motion_gate=True, gate_width=160,
+                 gate_threshold=15, gate_pixels=2):
+        self.detect_fps = detect_fps
+        self.max_interval = max_interval
+        self.motion_gate = motion_gate
+        self.gate_width = gate_width
+        self.gate_threshold = gate_threshold
+        self.gate_pixels = gate_pixels # Changed thumbnail pixels needed to trip the gate
+        self.checks = 0
+        self.runs = 0
+        self.reset()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Builds a scheduler from the known settings present (and not None) in a dict."""
+        kwargs = {}
+        if settings.get("detect_fps") is not None:
+            kwargs["detect_fps"] = settings["detect_fps"]
+        if settings.get("max_detect_interval") is not None:
+            kwargs["max_interval"] = settings["max_detect_interval"]
+        if settings.get("motion_gate") is not None:
+            kwargs["motion_gate"] = settings["motion_gate"]
+        return cls(**kwargs)
+
+    def reset(self):
+        """Forgets the last detection: the next frame is always detected."""
+        self._last_run = None
+        self._active = True
+        self._thumb = None      # Thumbnail of the frame being checked (gray)
+        self._reference = None  # Thumbnail of the last detected frame
+        self._sample = None     # Preallocated nearest-neighbour sample (2x thumbnail)
+        self._small = None      # Preallocated BGR thumbnail
+
+    def _thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        size = (self.gate_width, max(1, self.gate_width * h // w))
+        if self._small is None or self._small.shape[1::-1] != size:
+            self._sample = np.empty((size[1] * 2, size[0] * 2, 3), dtype=np.uint8)
+            self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self._thumb = np.empty((size[1], size[0]), dtype=np.uint8)
+            self._reference = None # Crop or resolution changed
+        cv2.resize(frame, (size[0] * 2, size[1] * 2), dst=self._sample, interpolation=cv2.INTER_NEAREST)
+        cv2.resize(self._sample, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._thumb)
+        return self._thumb
+
+    def should_detect(self, frame, timestamp=None):
+        """True if the full pipeline should run on 'frame'; call detected() after it ran."""
+        now = time.monotonic() if timestamp is None else timestamp
+        self.checks += 1
+        thumb = None
+        if self._last_run is not None:
+            elapsed = now - self._last_run
+            if self.detect_fps > 0 and elapsed < 1.0 / self.detect_fps:
+                return False
+            if self.motion_gate and not self._active and elapsed < self.max_interval:
+                thumb = self._thumbnail(frame)
+                if not self._moved(thumb):
+                    return False
+        if self.motion_gate and thumb is None:
+            self._thumbnail(frame) # Becomes the gate reference in detected()
+        self._last_run = now
+        self.runs += 1
+        return True
+
+    def _moved(self, thumb):
+        if self._reference is None:
+            return True
+        diff = cv2.absdiff(thumb, self._reference)
+        return np.count_nonzero(diff > self.gate_threshold) >= self.gate_pixels
+
+    def detected(self, active):
+        """
+        Records the full detection of the frame accepted by should_detect().
+        active: the detection found something (blobs or live tracks), keep detecting.
+        """
+        self._active = active
+        if self.motion_gate:
+            if self._reference is None:
+                self._reference = self._thumb.copy()
+            else:
+                np.copyto(self._reference, self._thumb)
+
+    def get_stats(self):
+        return {
+            'checks': self.checks,
+            'runs': self.runs,
+            'skipped': self.checks - self.runs,
+        }
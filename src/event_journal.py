@@ -0,0 +1,205 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+FIELDS = ("ts", "type", "message", "camera", "zone", "intrusions", "area", "seq", "data")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts REAL NOT NULL,
+    type TEXT NOT NULL,
+    message TEXT,
+    camera INTEGER,
+    zone INTEGER,
+    intrusions INTEGER,
+    area REAL,
+    seq INTEGER,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+"""
+
+class EventJournal:
+    """
+    Append-only event journal in rotated SQLite files (journal/events_<start>.db).
+    log() only enqueues; a background thread writes the queue in batches, one
+    transaction per batch. A new file is started when the current one exceeds
+    'max_bytes' or is older than 'max_age' seconds, and only the newest 'max_files'
+    files are kept. query() returns the events of a time range across files.
+    """
+    def __init__(self, directory="journal", max_bytes=64 * 1024 * 1024, max_age=24 * 3600, max_files=60,
+                 batch_size=256, flush_interval=0.5, max_queue=10000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_files = max_files
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0 # Events lost because the queue was full
+        self.written = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._db = None
+        self._db_path = None
+        self._db_start = 0.0
+        self._thread = threading.Thread(target=self._writer_loop, name="event-journal", daemon=True)
+        self._thread.start()
+
+    def log(self, type, message="", ts=None, camera=None, zone=None, intrusions=None, area=None, seq=None, **data):
+        """Queues one event (never blocks). Extra keyword fields are stored as JSON."""
+        row = (time.time() if ts is None else ts, type, message, camera, zone, intrusions,
+               area, seq, json.dumps(data) if data else None)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Blocks until every queued event is on disk."""
+        self._queue.join()
+
+    def close(self, timeout=5.0):
+        """Writes what is queued and stops the writer; gives up after 'timeout' seconds."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            print(f"[WARNING] Event journal: writer stalled, {self._queue.qsize()} events not written")
+            return
+        self._thread.join(timeout=timeout)
+
+    # --- Writer thread ---
+
+    def _writer_loop(self):
+        running = True
+        while running:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [r for r in batch if r is not None]
+            running = len(rows) == len(batch) # None = close()
+            try:
+                if rows:
+                    self._write(rows)
+            except (sqlite3.Error, OSError) as e:
+                # Keep the thread alive: a dead writer would fill the queue and drop every later event
+                print(f"[ERROR] Event journal: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        if self._db is not None:
+            self._db.close()
+
+    def _write(self, rows):
+        if self._db is None or self._needs_rotation():
+            self._rotate(rows[0][0])
+        with self._db:
+            self._db.executemany(f"INSERT INTO events ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})", rows)
+        self.written += len(rows)
+
+    def _needs_rotation(self):
+        if time.time() - self._db_start > self.max_age:
+            return True
+        size = os.path.getsize(self._db_path)
+        if os.path.exists(self._db_path + "-wal"): # Not yet checkpointed into the main file
+            size += os.path.getsize(self._db_path + "-wal")
+        return size > self.max_bytes
+
+    def _rotate(self, first_ts):
+        if self._db is not None:
+            self._db.close()
+            self._db = None # Retried on the next batch if opening the new file fails
+        self._db_start = time.time()
+        # The name records the first event time so queries can skip whole files
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(min(first_ts, self._db_start)))
+        path = os.path.join(self.directory, f"events_{stamp}.db")
+        n = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"events_{stamp}_{n}.db")
+            n += 1
+        self._db_path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+        files = list_journal_files(self.directory)
+        for old, _ in files[:max(0, len(files) - self.max_files)]:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(old + suffix):
+                    os.remove(old + suffix)
+
+    def query(self, start=None, end=None, types=None, camera=None, zone=None, limit=None):
+        """Events with start <= ts < end (epoch seconds) of this journal, oldest first."""
+        self.flush()
+        return query_journal(self.directory, start, end, types, camera, zone, limit)
+
+
+def list_journal_files(directory):
+    """[(path, start_epoch)] of the journal files in 'directory', oldest first."""
+    files = []
+    for name in os.listdir(directory):
+        if name.startswith("events_") and name.endswith(".db"):
+            stamp = name[len("events_"):len("events_") + 15]
+            try:
+                start = time.mktime(time.strptime(stamp, "%Y%m%d_%H%M%S"))
+            except ValueError:
+                continue
+            files.append((os.path.join(directory, name), start))
+    files.sort(key=lambda f: (f[1], f[0]))
+    return files
+
+def query_journal(directory, start=None, end=None, types=None, camera=None, zone=None, limit=None):
+    """
+    Reads events with start <= ts < end from the journal files in 'directory' (oldest first).
+    Files that start after 'end', or whose successor starts before 'start', are skipped.
+    """
+    files = list_journal_files(directory) if os.path.isdir(directory) else []
+    where, params = [], []
+    if start is not None:
+        where.append("ts >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("ts < ?")
+        params.append(end)
+    if types:
+        where.append(f"type IN ({', '.join('?' * len(types))})")
+        params.extend(types)
+    if camera is not None:
+        where.append("camera = ?")
+        params.append(camera)
+    if zone is not None:
+        where.append("zone = ?")
+        params.append(zone)
+    sql = f"SELECT {', '.join(FIELDS)} FROM events"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY ts"
+
+    events = []
+    for i, (path, file_start) in enumerate(files):
+        # File start times are rounded down to the second
+        if end is not None and file_start >= end:
+            break
+        if start is not None and i + 1 < len(files) and files[i + 1][1] + 1 < start:
+            continue
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for row in db.execute(sql, params):
+                event = dict(zip(FIELDS, row))
+                event.update(json.loads(event.pop("data") or "{}"))
+                events.append(event)
+                if limit is not None and len(events) >= limit:
+                    return events
+        finally:
+            db.close()
+    return events
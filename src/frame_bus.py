@@ -0,0 +1,234 @@
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.camera_manager import CameraManager, FramePacket
+
+class FrameRing:
+    """
+    Ring of preallocated frame slots in one shared memory block, written by one process
+    and read by any number of others without pickling or copying:
+
+        control (64 B): latest sequence number, slots, slot size, max h/w/c
+        meta (slots x 4 int64): sequence, timestamp (ns), h, w of each slot
+        data (slots x slot bytes): the frames
+
+    The writer marks a slot with sequence -1 while copying into it and publishes the
+    new sequence last. A reader gets a read-only view of a slot; the view stays valid
+    until the writer comes round to the same slot again ('slots' frames later), which
+    valid(seq) tells after the fact. Frames keep their size (smaller ones use part of a
+    slot); a frame larger than the slots is refused, never rescaled.
+    """
+    _CONTROL = 8 # int64 fields
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        control = np.ndarray((self._CONTROL,), dtype=np.int64, buffer=shm.buf)
+        self.slots, self.slot_bytes = int(control[1]), int(control[2])
+        self.max_shape = (int(control[3]), int(control[4]), int(control[5]))
+        header = 64 + -(-self.slots * 32 // 64) * 64
+        self._control = control
+        self._meta = np.ndarray((self.slots, 4), dtype=np.int64, buffer=shm.buf, offset=64)
+        self._data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=shm.buf, offset=header)
+
+    @classmethod
+    def create(cls, slots=6, max_shape=(1080, 1920, 3)):
+        slot_bytes = int(np.prod(max_shape))
+        header = 64 + -(-slots * 32 // 64) * 64
+        shm = shared_memory.SharedMemory(create=True, size=header + slots * slot_bytes)
+        control = np.ndarray((cls._CONTROL,), dtype=np.int64, buffer=shm.buf)
+        control[:] = (0, slots, slot_bytes, max_shape[0], max_shape[1], max_shape[2], 0, 0)
+        np.ndarray((slots, 4), dtype=np.int64, buffer=shm.buf, offset=64)[:] = 0
+        del control
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame, timestamp):
+        """
+        Copies 'frame' into the next slot and publishes it. Returns its sequence number.
+        Raises ValueError if the frame is larger than the slots: zones, references and
+        snapshots are in camera pixels, so a rescaled frame would silently misalign them.
+        """
+        max_h, max_w, channels = self.max_shape
+        h, w = frame.shape[:2]
+        if h > max_h or w > max_w:
+            raise ValueError(f"Frame {w}x{h} larger than the frame bus slots ({max_w}x{max_h})")
+        seq = int(self._control[0]) + 1
+        slot = seq % self.slots
+        meta = self._meta[slot]
+        meta[0] = -1
+        np.copyto(self._data[slot, :h * w * channels].reshape(h, w, channels), frame)
+        meta[1] = int(timestamp * 1e9)
+        meta[2] = h
+        meta[3] = w
+        meta[0] = seq
+        self._control[0] = seq
+        return seq
+
+    def latest_seq(self):
+        return int(self._control[0])
+
+    def read(self, seq=None):
+        """(read-only view, seq, timestamp) of frame 'seq' (default: the latest), or None if gone."""
+        if seq is None:
+            seq = int(self._control[0])
+        if seq <= 0:
+            return None
+        meta = self._meta[seq % self.slots]
+        if meta[0] != seq:
+            return None
+        h, w, channels = int(meta[2]), int(meta[3]), self.max_shape[2]
+        timestamp = meta[1] / 1e9
+        view = self._data[seq % self.slots, :h * w * channels].reshape(h, w, channels)
+        view.flags.writeable = False
+        if meta[0] != seq:
+            return None # Overwritten while the view was being made
+        return view, seq, timestamp
+
+    def valid(self, seq):
+        """True if frame 'seq' is still in its slot (a view of it was not overwritten)."""
+        return self._meta[seq % self.slots, 0] == seq
+
+    def wait_next(self, after_seq, timeout, poll=0.001):
+        """Waits until a frame newer than 'after_seq' is published; returns the latest seq or None."""
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = int(self._control[0])
+            if seq > after_seq:
+                return seq
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def close(self):
+        self._control = self._meta = self._data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass # Views still referenced; released with the process
+        if self.owner:
+            self.shm.unlink()
+
+
+def capture_worker(source, loop, slots, ring_queues, stop_event):
+    """
+    Capture process: camera -> frame ring, at the camera's own rate, reconnecting on loss.
+    The ring is created on the first frame, with slots of exactly that size, and its name
+    is sent on every queue of 'ring_queues' (the dashboard and detection processes attach
+    to it). The dashboard process unlinks it, since it outlives this one.
+    """
+    ring = None
+    oversize_reported = False
+    camera = CameraManager(source, threaded=False, loop=loop, realtime=True)
+    last_frame_time = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            frame = camera.read_frame()
+            if frame is None:
+                if camera.is_finished():
+                    print("[INFO] Capture source finished")
+                    break
+                if time.monotonic() - last_frame_time > 2.0:
+                    print("[INFO] Intentando reconectar cámara...")
+                    camera.release()
+                    camera = CameraManager(source, threaded=False, loop=loop, realtime=True)
+                    last_frame_time = time.monotonic()
+                time.sleep(0.01)
+                continue
+            last_frame_time = time.monotonic()
+            if ring is None:
+                ring = FrameRing.create(slots, frame.shape)
+                ring.owner = False
+                for ring_queue in ring_queues:
+                    ring_queue.put(ring.name)
+                print(f"[INFO] Frame bus: {slots} slots of {frame.shape[1]}x{frame.shape[0]} "
+                      f"({ring.slot_bytes * slots / 1e6:.0f} MB)")
+            try:
+                ring.write(frame, last_frame_time)
+            except ValueError as e:
+                # The camera came back at a higher resolution: restart to size the bus for it
+                if not oversize_reported:
+                    print(f"[ERROR] {e}; frames dropped until restart")
+                    oversize_reported = True
+    finally:
+        camera.release()
+        if ring is not None:
+            ring.close()
+
+
+class BusCamera:
+    """
+    CameraManager stand-in for the dashboard process: frames come from the ring filled by
+    the capture process, attached once its name arrives on 'ring_queue' (after the first
+    frame). read_latest() returns a read-only view (no copy); copy or crop it right away,
+    the slot is reused 'slots' frames later.
+    """
+    def __init__(self, ring_queue, source, loop, on_release=None):
+        self.ring = None
+        self._ring_queue = ring_queue
+        self.camera_id = source
+        self.loop = loop
+        self._on_release = on_release
+        self._last_seq = 0
+        self.frames_dropped = 0
+        self.frames_duplicated = 0
+
+    def _attach(self, timeout=0.0):
+        """True once the ring created by the capture process is attached."""
+        if self.ring is None:
+            try:
+                name = self._ring_queue.get(timeout=timeout) if timeout > 0 else self._ring_queue.get_nowait()
+            except queue.Empty:
+                return False
+            self.ring = FrameRing.attach(name)
+            self.ring.owner = True # Unlinked here on release
+        return True
+
+    def read_latest(self, timeout=0.0):
+        if not self._attach(timeout):
+            return None
+        seq = self.ring.latest_seq()
+        if seq <= self._last_seq and timeout > 0:
+            seq = self.ring.wait_next(self._last_seq, timeout) or self._last_seq
+        item = self.ring.read(seq)
+        if item is None:
+            return None
+        frame, seq, timestamp = item
+        if seq == self._last_seq:
+            self.frames_duplicated += 1
+        else:
+            self.frames_dropped += max(0, seq - self._last_seq - 1)
+            self._last_seq = seq
+        return FramePacket(frame, seq, timestamp)
+
+    def is_opening(self):
+        return not self._attach() or self.ring.latest_seq() == 0
+
+    def is_finished(self):
+        return False
+
+    def get_stats(self):
+        return {
+            'captured': self.ring.latest_seq() if self.ring is not None else 0,
+            'dropped': self.frames_dropped,
+            'duplicated': self.frames_duplicated,
+            'last_seq': self._last_seq,
+        }
+
+    def release(self):
+        if self._on_release is not None:
+            self._on_release()
+            self._on_release = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
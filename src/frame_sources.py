@@ -0,0 +1,176 @@
+import os
+import re
+import time
+
+import cv2
+
+from src.synthetic_scene import SyntheticScene
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+class _PacedSource:
+    """
+    Base for non-device sources. Mimics the parts of cv2.VideoCapture that CameraManager uses
+    (read / isOpened / release / get / set). With realtime=True frames are delivered at the
+    source fps like a camera, otherwise as fast as they can be produced.
+    """
+    def __init__(self, fps=30.0, realtime=False, loop=False):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.realtime = realtime
+        self.loop = loop
+        self.ended = False # Set when a non-looping source runs out of frames
+        self._next_time = None
+
+    def _pace(self):
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self._next_time is None:
+            self._next_time = now
+        elif self._next_time > now:
+            time.sleep(self._next_time - now)
+        self._next_time += 1.0 / self.fps
+
+    @property
+    def live(self):
+        """Paced sources behave like cameras; unpaced ones must not lose frames."""
+        return self.realtime
+
+    def set(self, prop, value):
+        return False # Resolution is fixed by the source
+
+    def seek(self, index):
+        """Moves to frame 'index' (0-based). Returns False if the source cannot seek."""
+        return False
+
+    def release(self):
+        pass
+
+
+class VideoFileSource(_PacedSource):
+    """Recorded video file (or stream URL) read with OpenCV's default backend."""
+    def __init__(self, path, realtime=False, loop=False):
+        self.cap = cv2.VideoCapture(path)
+        super().__init__(self.cap.get(cv2.CAP_PROP_FPS), realtime, loop)
+        self.path = path
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        self._pace()
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        self.ended = not ret
+        return ret, frame
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def seek(self, index):
+        self.ended = False
+        return self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageSequenceSource(_PacedSource):
+    """Folder of images played in file-name order."""
+    def __init__(self, folder, fps=30.0, realtime=False, loop=False):
+        super().__init__(fps, realtime, loop)
+        self.files = sorted(os.path.join(folder, f) for f in os.listdir(folder)
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        self.index = 0
+        self._shape = None
+        if self.files:
+            first = cv2.imread(self.files[0])
+            self._shape = first.shape if first is not None else None
+
+    def isOpened(self):
+        return len(self.files) > 0
+
+    def read(self):
+        if self.index >= len(self.files):
+            if not self.loop or not self.files:
+                self.ended = True
+                return False, None
+            self.index = 0
+        self._pace()
+        frame = cv2.imread(self.files[self.index])
+        self.index += 1
+        return frame is not None, frame
+
+    def seek(self, index):
+        self.ended = False
+        self.index = max(0, min(len(self.files), index))
+        return True
+
+    def get(self, prop):
+        if self._shape is None:
+            return 0
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._shape[1]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._shape[0]
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.files)
+        return 0
+
+
+class SyntheticSource(_PacedSource):
+    """
+    Moving-blob scene generator (see SyntheticScene).
+    Spec string: 'synthetic[:WIDTHxHEIGHT[:BLOBS[:SEED]]]', e.g. 'synthetic:1920x1080:8'.
+    The first 'warmup' frames show the empty background so the system can be armed on it.
+    """
+    def __init__(self, width=1280, height=720, blobs=5, seed=0, fps=30.0, realtime=False, warmup=30):
+        super().__init__(fps, realtime, loop=True)
+        self.scene = SyntheticScene(width, height, blobs=blobs, seed=seed)
+        self.warmup = warmup
+        self.frames = 0
+        self.last_truth = None
+
+    @classmethod
+    def from_spec(cls, spec, realtime=False):
+        match = re.match(r"^synthetic(?::(\d+)x(\d+))?(?::(\d+))?(?::(\d+))?$", spec)
+        if match is None:
+            raise ValueError(f"Invalid synthetic source spec: {spec}")
+        w, h, blobs, seed = match.groups()
+        return cls(int(w or 1280), int(h or 720), int(blobs or 5), int(seed or 0), realtime=realtime)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self._pace()
+        self.frames += 1
+        if self.frames <= self.warmup:
+            self.last_truth = None
+            return True, self.scene.reference_frame()
+        frame, self.last_truth = self.scene.next_frame()
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.scene.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.scene.height
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0
+
+
+def open_source(source, realtime=False, loop=False):
+    """Returns a capture object for non-device sources, or None if 'source' is a camera device."""
+    if not isinstance(source, str) or source.isdigit():
+        return None
+    if source.startswith("synthetic"):
+        return SyntheticSource.from_spec(source, realtime=realtime)
+    if os.path.isdir(source):
+        return ImageSequenceSource(source, realtime=realtime, loop=loop)
+    return VideoFileSource(source, realtime=realtime, loop=loop)
@@ -0,0 +1,245 @@
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from src.camera_manager import CameraManager
+from src.zone_manager import ZoneManager
+from src.state_manager import StateManager
+from src.detection_pipeline import DetectionPipeline
+from src.detection_scheduler import DetectionScheduler
+from src.profiler import StageProfiler, StartupProfile
+from src.clip_recorder import ClipRecorder
+from src.event_journal import EventJournal
+from src.preview_server import PreviewServer
+from src.alarm_dispatcher import AlarmDispatcher, create_sink
+from src.armed_snapshot import save_snapshot, load_snapshot, apply_snapshot
+
+def run_headless(args):
+    """
+    Capture -> detect -> zone check -> event output, without any window or dashboard.
+    Arms from the mean of the first N frames, or from a saved reference image.
+    Prints intrusion events as they happen and throughput once per second.
+    """
+    startup = StartupProfile()
+    source = args.source
+    zones_file = args.zones[0] if args.zones else "zones.json"
+
+    # Files and synthetic scenes are processed as fast as possible, without dropping frames
+    camera = CameraManager(source, threaded=True, buffer_size=8, loop=args.loop, realtime=False)
+    zone_manager = ZoneManager()
+    zone_manager.load_zones(zones_file)
+    state_manager = StateManager()
+    state_manager.apply_settings(vars(args))
+    state_manager.profiler = StageProfiler(enabled=not args.no_profile)
+    state_manager.buffers.enabled = not args.no_buffer_pool
+    pipeline = DetectionPipeline(state_manager, zone_manager, scheduler=DetectionScheduler.from_settings(vars(args)))
+
+    reference = None
+    if args.reference:
+        reference = cv2.imread(args.reference)
+        if reference is None:
+            print(f"[ERROR] Could not read reference image {args.reference}")
+            return
+    # Warm start from the armed-state snapshot (settings, zones and reference), if given
+    warm_snapshot = None
+    if args.snapshot and not args.no_warm_start and reference is None:
+        warm_snapshot = load_snapshot(args.snapshot)
+    arm_frames = max(1, args.arm_frames)
+    accumulator = None
+    accumulated = 0
+
+    events_file = open(args.events_file, "a") if args.events_file else None
+    journal = EventJournal(args.journal, max_bytes=int(args.journal_max_mb * 1024 * 1024),
+                           max_age=args.journal_max_hours * 3600) if args.journal else None
+    recorder = None
+    if args.record_clips:
+        recorder = ClipRecorder(args.record_clips, pre_seconds=args.pre_seconds, post_seconds=args.post_seconds,
+                                fps=args.clip_fps, scale=args.clip_scale)
+
+    dispatcher = None
+    if args.alarm_sink:
+        dispatcher = AlarmDispatcher([create_sink(spec) for spec in args.alarm_sink], retries=args.alarm_retries)
+
+    preview_server = None
+    if args.http_port:
+        preview_server = PreviewServer(args.http_port, args.http_host, fps=args.http_fps, quality=args.http_quality,
+                                       streams=("video",))
+        print(f"[INFO] Remote preview on http://{args.http_host}:{preview_server.port}/")
+
+    frames = 0
+    last_seq = 0
+    window_frames = 0
+    window_detect = 0.0
+    window_runs = 0
+    window_start = time.monotonic()
+    last_frame_time = time.monotonic()
+    deadline = time.monotonic() + args.duration if args.duration else None
+
+    print(f"[INFO] Headless: source={source} zones={zones_file} ({len(zone_manager.get_zones())})")
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            if camera.is_live():
+                # Cameras: always the newest frame, so a slow detection drops frames instead of
+                # falling behind. Files and synthetic scenes: every frame, in order.
+                packet = camera.read_latest(timeout=1.0)
+                if packet is not None and packet.seq == last_seq:
+                    packet = None # Nothing new within the timeout
+            else:
+                packet = camera.read_next(timeout=1.0)
+            if packet is None:
+                if camera.is_finished():
+                    print(f"[INFO] End of source {source}")
+                    break
+                if time.monotonic() - last_frame_time > 5.0:
+                    print("[INFO] Intentando reconectar cámara...")
+                    camera.release()
+                    camera = CameraManager(source, threaded=True, buffer_size=8, loop=args.loop, realtime=False)
+                    last_seq = 0
+                    last_frame_time = time.monotonic()
+                continue
+            last_frame_time = time.monotonic()
+            last_seq = packet.seq
+            frame = packet.frame
+            frames += 1
+            if startup.mark("first_frame"):
+                print(f"[STARTUP] {startup.summary()}")
+            if recorder is not None:
+                recorder.add_frame(frame, packet.timestamp)
+
+            # 1. Arm (snapshot, saved reference or mean of the first N frames)
+            if warm_snapshot is not None:
+                if warm_snapshot['reference_frame'].shape == frame.shape:
+                    apply_snapshot(warm_snapshot, state_manager, zone_manager, overrides=vars(args))
+                else:
+                    print(f"[WARNING] Snapshot {args.snapshot} does not match the camera resolution, arming from frames")
+                warm_snapshot = None
+            if not state_manager.is_hot():
+                if reference is not None:
+                    if reference.shape != frame.shape:
+                        print(f"[WARNING] Reference is {reference.shape[1]}x{reference.shape[0]}, camera is {frame.shape[1]}x{frame.shape[0]}. Resizing.")
+                        reference = cv2.resize(reference, (frame.shape[1], frame.shape[0]))
+                    state_manager.set_hot(reference)
+                else:
+                    if accumulator is None or accumulator.shape != frame.shape:
+                        accumulator = np.zeros(frame.shape, dtype=np.float32)
+                        accumulated = 0
+                    cv2.accumulate(frame, accumulator)
+                    accumulated += 1
+                    if accumulated < arm_frames:
+                        continue
+                    reference = cv2.convertScaleAbs(accumulator, alpha=1.0 / accumulated)
+                    accumulator = None
+                    state_manager.set_hot(reference)
+                    if args.save_reference:
+                        cv2.imwrite(args.save_reference, reference)
+                        print(f"[INFO] Reference saved to {args.save_reference}")
+                    if args.snapshot:
+                        save_snapshot(args.snapshot, state_manager, zone_manager)
+                        print(f"[INFO] Armed state saved to {args.snapshot}")
+                if startup.mark("armed"):
+                    print(f"[STARTUP] {startup.summary()}")
+                continue
+            if startup.mark("armed"):
+                print(f"[STARTUP] {startup.summary()}")
+
+            # 2. Detect + zone check
+            t0 = time.perf_counter()
+            result = pipeline.process(frame, timestamp=packet.timestamp)
+            window_detect += time.perf_counter() - t0
+            window_frames += 1
+            window_runs += result['detected']
+
+            # 3. Events
+            if result['new_intrusion']:
+                event = {
+                    'time': time.time(),
+                    'seq': packet.seq,
+                    'zones': result['zones_hit'],
+                    'intrusions': state_manager.intrusions,
+                    'blobs': len(result['hits']),
+                    'area': float(max(result['areas'])),
+                    'tracks': [e['track'] for e in result['events'] if e['type'] == 'ENTER'],
+                }
+                print(f"[ALARMA] {json.dumps(event)}")
+                if events_file:
+                    events_file.write(json.dumps(event) + "\n")
+                    events_file.flush()
+                if journal is not None:
+                    journal.log("ALARMA", f"Intrusión Detectada! Zonas {event['zones']} (Nivel {event['intrusions']})",
+                                ts=event['time'], zone=event['zones'][0], intrusions=event['intrusions'],
+                                area=event['area'], seq=event['seq'], zones=event['zones'], blobs=event['blobs'],
+                                tracks=event['tracks'])
+                if recorder is not None:
+                    recorder.trigger(frame, event)
+                if dispatcher is not None:
+                    dispatcher.dispatch(dict(event, type="ALARMA", zone=event['zones'][0]))
+            if dispatcher is not None:
+                for report in dispatcher.poll():
+                    print(f"[ERROR] {json.dumps(report)}")
+                    if journal is not None:
+                        journal.log("ERROR", f"Alarma no entregada a {report['sink']}: {report['error']}",
+                                    sink=report['sink'], events=report['events'])
+            for track_event in result['events']:
+                if track_event['type'] != 'EXIT':
+                    continue
+                print(f"[TRACK] {json.dumps(track_event)}")
+                if journal is not None:
+                    journal.log("SALIDA", f"Objeto #{track_event['track']} salió de zona {track_event['zone']}",
+                                ts=track_event['time'], zone=track_event['zone'], seq=packet.seq,
+                                track=track_event['track'], dwell=track_event['dwell'])
+            if recorder is not None:
+                for report in recorder.poll():
+                    print(f"[CLIP] {json.dumps(report)}")
+                    if journal is not None:
+                        journal.log(report['type'], report.get('path', ''), seq=report['info'].get('seq'))
+
+            # Remote preview: annotate only when a viewer will actually get this frame
+            if preview_server is not None and preview_server.wants("video"):
+                preview = frame.copy()
+                if len(result['blobs']):
+                    cv2.polylines(preview, list(result['blobs'].corners()), True, (0, 255, 0), 2)
+                for zone in zone_manager.get_zones():
+                    cv2.polylines(preview, [zone.astype(np.int32)], True, (0, 0, 255), 2)
+                preview_server.publish("video", preview)
+                preview_server.set_status(frames=frames, intrusions=state_manager.intrusions,
+                                          intrusion=bool(result['intrusion']))
+
+            # 4. Throughput
+            now = time.monotonic()
+            if now - window_start >= 1.0:
+                stats = camera.get_stats()
+                elapsed = now - window_start
+                detect_ms = window_detect / window_frames * 1000 if window_frames else 0.0
+                print(f"[STATS] fps={window_frames / elapsed:.1f} detect={detect_ms:.2f}ms "
+                      f"detected={window_runs}/{window_frames} frames={frames} dropped={stats['dropped']} intrusions={state_manager.intrusions}")
+                if state_manager.profiler.enabled:
+                    print(f"[PERF] {state_manager.profiler.summary()}")
+                sys.stdout.flush()
+                window_start = now
+                window_frames = 0
+                window_detect = 0.0
+                window_runs = 0
+    except KeyboardInterrupt:
+        pass
+    finally:
+        camera.release()
+        if recorder is not None:
+            recorder.close()
+            for report in recorder.poll():
+                print(f"[CLIP] {json.dumps(report)}")
+                if journal is not None:
+                    journal.log(report['type'], report.get('path', ''), seq=report['info'].get('seq'))
+        if events_file:
+            events_file.close()
+        if journal is not None:
+            journal.close()
+        if preview_server is not None:
+            preview_server.close()
+        if dispatcher is not None:
+            dispatcher.close()
+            for report in dispatcher.poll():
+                print(f"[ERROR] {json.dumps(report)}")
+        print(f"[INFO] Headless stopped after {frames} frames, {state_manager.intrusions} intrusions")
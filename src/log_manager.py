@@ -2,18 +2,25 @@ from collections import deque
 import time
 
 class LogManager:
-    def __init__(self, max_len=10):
+    def __init__(self, max_len=10, journal=None):
         self.logs = deque(maxlen=max_len)
+        self.journal = journal # Optional EventJournal: every log is also persisted
         # Add initial system log
         self.add_log("INFO", "Sistema Iniciado - Esperando instrucciones")
 
-    def add_log(self, type, message):
+    def add_log(self, type, message, **fields):
         """
-        Types: INFO, ALARMA, ERROR, SISTEMA
+        Types: INFO, ALARMA, SALIDA, ERROR, SISTEMA
+        fields: structured data for the journal (camera, zone, intrusions, area, seq, ...)
         """
-        timestamp = time.strftime("%H:%M:%S")
+        ts = time.time()
+        if self.journal is not None:
+            self.journal.log(type, message, ts=ts, **fields)
+
+        timestamp = time.strftime("%H:%M:%S", time.localtime(ts))
         entry = {
             'time': timestamp,
+            'ts': ts,
             'type': type,
             'msg': message
         }
@@ -25,3 +32,7 @@ class LogManager:
 
     def get_logs(self):
         return list(self.logs)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
@@ -0,0 +1,236 @@
+import json
+import multiprocessing as mp
+import os
+import time
+
+import cv2
+import numpy as np
+
+from src.detection_pipeline import DetectionPipeline
+from src.detection_scheduler import DetectionScheduler
+from src.frame_sources import open_source
+from src.state_manager import StateManager
+from src.zone_manager import ZoneManager
+
+_references = {} # Per worker process: reference frame of each (file, arm frames) / image
+
+def _init_worker():
+    # One OpenCV thread per process: the pool already keeps every core busy
+    cv2.setNumThreads(1)
+
+def clock(seconds):
+    """Video time as HH:MM:SS.s"""
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:04.1f}"
+
+def plan_segments(paths, segment_seconds, warmup_seconds):
+    """
+    Splits every file into segments of 'segment_seconds'. Returns (segments, files):
+        segments: dicts {'segment', 'file', 'fps', 'warmup_start', 'start', 'end'} in frame
+                  numbers ('end' None = up to the end of the file; the last segment reads to
+                  the end so inexact frame counts lose nothing)
+        files: {path: {'fps', 'frames'}} for the files that could be opened
+    """
+    segments, files = [], {}
+    for path in paths:
+        source = open_source(path)
+        if source is None or not source.isOpened():
+            print(f"[ERROR] Could not open {path}, skipped")
+            continue
+        fps = source.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = int(source.get(cv2.CAP_PROP_FRAME_COUNT))
+        source.release()
+        files[path] = {'fps': fps, 'frames': frames}
+
+        length = max(1, int(round(segment_seconds * fps)))
+        warmup = max(0, int(round(warmup_seconds * fps)))
+        starts = list(range(0, frames, length)) if frames > 0 else [0]
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else None
+            segments.append({'segment': len(segments), 'file': path, 'fps': fps,
+                             'warmup_start': max(0, start - warmup), 'start': start, 'end': end})
+    return segments, files
+
+def _reference(path, arm_frames, reference_image):
+    """Arming reference of a file: the saved image, or the mean of its first 'arm_frames' frames (like headless)."""
+    key = reference_image or (path, arm_frames)
+    if key in _references:
+        return _references[key]
+    if reference_image:
+        reference = cv2.imread(reference_image)
+        if reference is None:
+            raise RuntimeError(f"Could not read reference image {reference_image}")
+    else:
+        source = open_source(path)
+        accumulator = None
+        count = 0
+        while count < max(1, arm_frames):
+            ok, frame = source.read()
+            if not ok:
+                break
+            if accumulator is None:
+                accumulator = np.zeros(frame.shape, dtype=np.float32)
+            cv2.accumulate(frame, accumulator)
+            count += 1
+        source.release()
+        if accumulator is None:
+            raise RuntimeError(f"No frames in {path}")
+        reference = cv2.convertScaleAbs(accumulator, alpha=1.0 / count)
+    _references[key] = reference
+    return reference
+
+def analyze_segment(task):
+    """
+    Detection over one segment (runs in a pool process). The frames from 'warmup_start' to
+    'start' only warm up the background model, tracker and motion gate, and their events are
+    dropped: they belong to the previous segment, which reports them. A stay that crosses a
+    segment boundary is reported as one alarm (in the segment it started) and its exit dwell
+    counts from the warm-up start of the next segment.
+    Returns {'segment', 'file', 'events', 'frames', 'intrusion_frames', 'seconds' (CPU time)}.
+    """
+    started = time.process_time()
+    path, fps = task['file'], task['fps']
+    reference = _reference(path, task['arm_frames'], task['reference'])
+
+    state_manager = StateManager()
+    state_manager.apply_settings(task['settings'])
+    zone_manager = ZoneManager()
+    zone_manager.set_zones(task['zones'])
+    pipeline = DetectionPipeline(state_manager, zone_manager,
+                                 scheduler=DetectionScheduler.from_settings(task['settings']))
+
+    source = open_source(path)
+    index = task['warmup_start']
+    if index and not source.seek(index):
+        for _ in range(index): # Not seekable: decode up to the warm-up start
+            source.read()
+
+    events = []
+    frames = intrusion_frames = 0
+    while task['end'] is None or index < task['end']:
+        ok, frame = source.read()
+        if not ok:
+            break
+        if not state_manager.is_hot():
+            if reference.shape != frame.shape:
+                print(f"[WARNING] Reference is {reference.shape[1]}x{reference.shape[0]}, {path} is {frame.shape[1]}x{frame.shape[0]}. Resizing.")
+                reference = cv2.resize(reference, (frame.shape[1], frame.shape[0]))
+            state_manager.set_hot(reference)
+
+        # Video time as the timestamp: dwell times and --detect-fps follow the recording, not the CPU
+        t = index / fps
+        result = pipeline.process(frame, timestamp=t)
+        if index >= task['start']:
+            frames += 1
+            intrusion_frames += bool(result['intrusion'])
+            if result['new_intrusion']:
+                events.append({'type': 'ALARMA', 'file': path, 'segment': task['segment'], 'frame': index,
+                               'time': t, 'zones': result['zones_hit'], 'blobs': len(result['hits']),
+                               'area': float(max(result['areas'])) if result['areas'] else None,
+                               'tracks': [e['track'] for e in result['events'] if e['type'] == 'ENTER']})
+            for event in result['events']:
+                if event['type'] == 'EXIT':
+                    events.append({'type': 'SALIDA', 'file': path, 'segment': task['segment'], 'frame': index,
+                                   'time': t, 'zone': event['zone'], 'track': event['track'],
+                                   'dwell': event['dwell']})
+        index += 1
+    source.release()
+    return {'segment': task['segment'], 'file': path, 'events': events, 'frames': frames,
+            'intrusion_frames': intrusion_frames, 'seconds': time.process_time() - started}
+
+def summarize(results, files, wall_seconds, workers):
+    """Merged timeline (file order, then video time) and totals of the segment results."""
+    order = {path: i for i, path in enumerate(files)}
+    timeline = sorted((e for r in results for e in r['events']),
+                      key=lambda e: (order[e['file']], e['frame'], e['type'] != 'SALIDA'))
+    per_file = {}
+    for path, info in files.items():
+        mine = [r for r in results if r['file'] == path]
+        frames = sum(r['frames'] for r in mine)
+        per_file[path] = {
+            'frames': frames,
+            'seconds': frames / info['fps'],
+            'alarms': sum(1 for r in mine for e in r['events'] if e['type'] == 'ALARMA'),
+            'intrusion_seconds': sum(r['intrusion_frames'] for r in mine) / info['fps'],
+        }
+    alarms_per_zone = {}
+    for event in timeline:
+        if event['type'] == 'ALARMA':
+            for zone in event['zones']:
+                alarms_per_zone[zone] = alarms_per_zone.get(zone, 0) + 1
+    video_seconds = sum(f['seconds'] for f in per_file.values())
+    cpu_seconds = sum(r['seconds'] for r in results)
+    summary = {
+        'files': per_file,
+        'segments': len(results),
+        'frames': sum(f['frames'] for f in per_file.values()),
+        'video_seconds': video_seconds,
+        'alarms': sum(f['alarms'] for f in per_file.values()),
+        'alarms_per_zone': alarms_per_zone,
+        'exits': sum(1 for e in timeline if e['type'] == 'SALIDA'),
+        'intrusion_seconds': sum(f['intrusion_seconds'] for f in per_file.values()),
+        'workers': workers,
+        'wall_seconds': wall_seconds,
+        'cpu_seconds': cpu_seconds,
+        'realtime_factor': video_seconds / wall_seconds if wall_seconds > 0 else 0.0,
+        'parallel_speedup': cpu_seconds / wall_seconds if wall_seconds > 0 else 0.0, # Cores kept busy on average
+    }
+    return timeline, summary
+
+def run_analysis(args):
+    """
+    --analyze: detection over recorded files instead of a camera, split into time segments
+    processed in parallel (one process per core), with a merged intrusion timeline.
+    """
+    zones_file = args.zones[0] if args.zones else "zones.json"
+    zone_manager = ZoneManager()
+    zone_manager.load_zones(zones_file)
+    zones = [z.tolist() for z in zone_manager.get_zones()]
+    if not zones:
+        print(f"[WARNING] No zones in {zones_file}: no alarms can be raised")
+    settings = {name: getattr(args, name, None) for name in StateManager.SETTINGS + DetectionScheduler.SETTINGS}
+
+    segments, files = plan_segments(args.analyze, args.segment_seconds, args.warmup_seconds)
+    if not segments:
+        print("[ERROR] Nothing to analyze")
+        return None
+    tasks = [dict(segment, zones=zones, settings=settings, arm_frames=args.arm_frames, reference=args.reference)
+             for segment in segments]
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(tasks)))
+    print(f"[INFO] Analyzing {len(files)} files in {len(tasks)} segments of {args.segment_seconds:g}s "
+          f"with {workers} processes (zones={zones_file} ({len(zones)}))")
+
+    results = []
+    start = time.perf_counter()
+    ctx = mp.get_context("spawn") # Same behaviour on Windows and Linux
+    with ctx.Pool(workers, initializer=_init_worker) as pool:
+        for result in pool.imap_unordered(analyze_segment, tasks):
+            results.append(result)
+            segment = segments[result['segment']]
+            fps = segment['fps']
+            end = f"{clock(segment['end'] / fps)}" if segment['end'] is not None else "end"
+            print(f"[INFO] Segment {len(results)}/{len(tasks)} {os.path.basename(result['file'])} "
+                  f"{clock(segment['start'] / fps)}-{end}: {result['frames']} frames in {result['seconds']:.1f}s CPU, "
+                  f"{len(result['events'])} events")
+    timeline, summary = summarize(results, files, time.perf_counter() - start, workers)
+
+    for event in timeline:
+        name = os.path.basename(event['file'])
+        if event['type'] == 'ALARMA':
+            area = f", área {event['area']:.0f} px" if event['area'] is not None else ""
+            message = f"Intrusión Detectada! Zonas {event['zones']} (objetos {event['tracks']}{area})"
+        else:
+            message = f"Objeto #{event['track']} salió de zona {event['zone']} ({event['dwell']:.1f}s)"
+        print(f"{name} {clock(event['time'])} {event['type']:<7} {message}")
+    zones_text = ", ".join(f"zona {zone}: {count}" for zone, count in sorted(summary['alarms_per_zone'].items()))
+    print(f"[INFO] {summary['alarms']} alarmas ({zones_text or 'ninguna'}), {summary['exits']} salidas, "
+          f"intrusión durante {clock(summary['intrusion_seconds'])}")
+    print(f"[INFO] {clock(summary['video_seconds'])} de video ({summary['frames']} frames) en {summary['wall_seconds']:.1f}s: "
+          f"{summary['realtime_factor']:.1f}x tiempo real, {summary['parallel_speedup']:.1f}x en paralelo con {workers} procesos")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({'summary': summary, 'timeline': timeline}, f, indent=2)
+        print(f"[INFO] Report saved to {args.report}")
+    return timeline, summary
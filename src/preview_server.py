@@ -0,0 +1,221 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+_BOUNDARY = "frame"
+
+_INDEX = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Sistema de Seguridad Visual</title>
+<style>body{{background:#202020;color:#ddd;font-family:sans-serif}} img{{max-width:100%}}</style></head>
+<body><h3>Sistema de Seguridad Visual</h3>{images}<pre id="status"></pre>
+<script>
+async function poll() {{
+  try {{ document.getElementById('status').textContent = JSON.stringify(await (await fetch('/status')).json(), null, 2); }} catch (e) {{}}
+  setTimeout(poll, 1000);
+}}
+poll();
+</script></body></html>
+"""
+
+class _Stream:
+    """Latest frame and latest JPEG of one published image ('video', 'dashboard')."""
+    def __init__(self):
+        self.frame = None       # Newest published frame, not yet encoded
+        self.free = []          # Frame buffers ready for reuse
+        self.jpeg = None
+        self.jpeg_seq = 0
+        self.jpeg_time = 0.0
+        self.last_publish = 0.0
+        self.viewers = 0
+        self.snapshot_wanted = 0 # Snapshot requests waiting for a fresh JPEG
+        self.published = 0
+        self.encoded = 0
+
+
+class PreviewServer:
+    """
+    HTTP server for remote viewers (own threads, never blocks the detection loop):
+        /                      page with the streams and the status
+        /<stream>.mjpg         MJPEG stream (multipart/x-mixed-replace)
+        /<stream>.jpg          single JPEG snapshot
+        /status                JSON status (set_status() fields plus server counters)
+
+    The loop calls publish(name, frame); it only copies the frame into a pooled buffer,
+    and only when someone is watching and at most 'fps' times per second. One encoder
+    thread turns the newest frame of each stream into a JPEG, once, and every client
+    sends that same JPEG. A slow client simply skips to the newest JPEG when it is ready
+    for the next one; frames published in between are never encoded.
+    """
+    def __init__(self, port=8080, host="127.0.0.1", fps=10.0, quality=80, streams=("video", "dashboard")):
+        self.fps = fps
+        self.quality = quality
+        self._cond = threading.Condition()
+        self._streams = {name: _Stream() for name in streams}
+        self._status = {}
+        self._running = True
+
+        self._httpd = ThreadingHTTPServer((host, port), _PreviewHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.preview = self
+        self.port = self._httpd.server_address[1]
+        self._http_thread = threading.Thread(target=self._httpd.serve_forever, name="preview-http", daemon=True)
+        self._encoder_thread = threading.Thread(target=self._encode_loop, name="preview-encoder", daemon=True)
+        self._http_thread.start()
+        self._encoder_thread.start()
+
+    # --- Detection loop side ---
+
+    def wants(self, name):
+        """True if a frame published now for 'name' would be used (viewers and rate)."""
+        stream = self._streams.get(name)
+        if stream is None or not (stream.viewers or stream.snapshot_wanted):
+            return False
+        return time.monotonic() - stream.last_publish >= 1.0 / self.fps
+
+    def publish(self, name, frame):
+        """Offers the current image of a stream. Returns True if it was taken."""
+        if not self.wants(name):
+            return False
+        stream = self._streams[name]
+        stream.last_publish = time.monotonic()
+        with self._cond:
+            buffer = stream.free.pop() if stream.free else None
+        if buffer is None or buffer.shape != frame.shape:
+            buffer = np.empty_like(frame)
+        np.copyto(buffer, frame)
+        with self._cond:
+            if stream.frame is not None and stream.frame.shape == buffer.shape:
+                stream.free.append(stream.frame) # Superseded before it was encoded
+            stream.frame = buffer
+            stream.published += 1
+            self._cond.notify_all()
+        return True
+
+    def set_status(self, **fields):
+        """Fields reported by /status (must be JSON serialisable)."""
+        with self._cond:
+            self._status.update(fields)
+
+    def close(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._encoder_thread.join(timeout=2.0)
+
+    # --- Encoder thread ---
+
+    def _encode_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while self._running:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running or any(s.frame is not None for s in self._streams.values()), 1.0)
+                pending = [(s, s.frame) for s in self._streams.values() if s.frame is not None]
+                for stream, _ in pending:
+                    stream.frame = None
+            for stream, frame in pending:
+                ok, jpeg = cv2.imencode(".jpg", frame, params)
+                with self._cond:
+                    stream.free.append(frame)
+                    if ok:
+                        stream.jpeg = jpeg.tobytes()
+                        stream.jpeg_seq += 1
+                        stream.jpeg_time = time.monotonic()
+                        stream.encoded += 1
+                    self._cond.notify_all()
+
+    # --- HTTP side ---
+
+    def _next_jpeg(self, stream, last_seq, timeout):
+        """Waits for a JPEG newer than 'last_seq'; returns (jpeg, seq) or (None, last_seq)."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._running or stream.jpeg_seq > last_seq, timeout)
+            if stream.jpeg_seq > last_seq:
+                return stream.jpeg, stream.jpeg_seq
+            return None, last_seq
+
+    def _snapshot(self, stream, max_age=1.0, timeout=2.0):
+        with self._cond:
+            if stream.jpeg is not None and time.monotonic() - stream.jpeg_time <= max_age:
+                return stream.jpeg
+            stream.snapshot_wanted += 1
+            seq = stream.jpeg_seq
+        try:
+            jpeg, _ = self._next_jpeg(stream, seq, timeout)
+            return jpeg
+        finally:
+            with self._cond:
+                stream.snapshot_wanted -= 1
+
+    def get_status(self):
+        with self._cond:
+            status = dict(self._status)
+            status['streams'] = {name: {'viewers': s.viewers, 'published': s.published, 'encoded': s.encoded}
+                                 for name, s in self._streams.items()}
+        return status
+
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = 10.0 # A viewer that stops reading is disconnected instead of holding a thread forever
+
+    def log_message(self, format, *args):
+        pass # Keep the console for the system's own messages
+
+    def do_GET(self):
+        server = self.server.preview
+        path = urlparse(self.path).path.strip("/")
+        name, _, extension = path.partition(".")
+        if path in ("", "index.html"):
+            images = "".join(f'<p><img src="/{n}.mjpg"></p>' for n in server._streams)
+            self._send(200, "text/html; charset=utf-8", _INDEX.format(images=images).encode("utf-8"))
+        elif path == "status":
+            self._send(200, "application/json", json.dumps(server.get_status()).encode("utf-8"))
+        elif name in server._streams and extension == "jpg":
+            jpeg = server._snapshot(server._streams[name])
+            if jpeg is None:
+                self._send(503, "text/plain", b"Sin imagen disponible")
+            else:
+                self._send(200, "image/jpeg", jpeg)
+        elif name in server._streams and extension == "mjpg":
+            self._stream(server, server._streams[name])
+        else:
+            self._send(404, "text/plain", b"No encontrado")
+
+    def _send(self, code, content_type, body):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, server, stream):
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={_BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        with server._cond:
+            stream.viewers += 1
+        seq = 0
+        try:
+            while server._running:
+                jpeg, seq = server._next_jpeg(stream, seq, 1.0)
+                if jpeg is None:
+                    continue
+                self.wfile.write(f"--{_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode("ascii"))
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        except OSError:
+            pass # Viewer went away or timed out
+        finally:
+            with server._cond:
+                stream.viewers -= 1
@@ -0,0 +1,135 @@
+import time
+
+import numpy as np
+
+class _Span:
+    """Times one 'with' block and records it under its stage name."""
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+class _NullSpan:
+    """Shared no-op span returned while profiling is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+class StageProfiler:
+    """
+    Named timing spans around the pipeline stages:
+
+        with profiler.span("preprocess"):
+            ...
+
+    Each stage keeps its last 'window' samples (nanoseconds) in a ring, from which
+    percentiles are computed on demand (stats()), plus a running sum of the ring, so the
+    per-frame bottleneck() and summary() cost no more than a dict walk. When disabled, span() returns
+    a shared no-op context manager and nothing is recorded.
+    Spans of the same name must not be nested.
+    """
+    def __init__(self, enabled=True, window=300):
+        self.enabled = enabled
+        self.window = window
+        self._spans = {}
+        self._samples = {}
+        self._count = {}
+        self._sum = {} # Sum of the samples currently in each ring (ns)
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        span = self._spans.get(name)
+        if span is None:
+            span = self._spans[name] = _Span(self, name)
+        return span
+
+    def record(self, name, elapsed_ns):
+        ring = self._samples.get(name)
+        if ring is None:
+            ring = self._samples[name] = np.zeros(self.window, dtype=np.int64)
+            self._count[name] = 0
+            self._sum[name] = 0
+        slot = self._count[name] % self.window
+        self._sum[name] += elapsed_ns - int(ring[slot])
+        ring[slot] = elapsed_ns
+        self._count[name] += 1
+
+    def reset(self):
+        self._samples.clear()
+        self._count.clear()
+        self._sum.clear()
+
+    def means(self):
+        """{stage: mean ms over its window} in first-recorded order (no percentiles)."""
+        return {name: total / min(self._count[name], self.window) / 1e6 for name, total in self._sum.items()}
+
+    def stats(self):
+        """{stage: {'mean', 'p50', 'p95', 'p99' (ms), 'count'}} in first-recorded order."""
+        result = {}
+        for name, ring in self._samples.items():
+            count = self._count[name]
+            samples = ring[:min(count, self.window)] / 1e6
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+            result[name] = {
+                'mean': float(samples.mean()),
+                'p50': float(p50),
+                'p95': float(p95),
+                'p99': float(p99),
+                'count': count,
+            }
+        return result
+
+    def bottleneck(self, exclude=()):
+        """(stage, mean ms) of the slowest stage, or (None, 0.0) if nothing was recorded."""
+        stages = [(mean, name) for name, mean in self.means().items() if name not in exclude]
+        if not stages:
+            return None, 0.0
+        mean, name = max(stages)
+        return name, mean
+
+    def summary(self, exclude=()):
+        """One line with the mean ms of every stage, e.g. 'preprocess 4.1 | diff 1.2 | render 3.0 ms'."""
+        parts = [f"{name} {mean:.1f}" for name, mean in self.means().items() if name not in exclude]
+        return " | ".join(parts) + " ms" if parts else ""
+
+
+class StartupProfile:
+    """
+    Startup milestones ('first_frame', 'armed', ...) in seconds since 'start'
+    (a time.perf_counter() value taken as early as possible). Only the first mark
+    of each name counts.
+    """
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = {}
+
+    def mark(self, name):
+        """Records 'name' now; returns True the first time."""
+        if name in self.marks:
+            return False
+        self.marks[name] = time.perf_counter() - self.start
+        return True
+
+    def summary(self):
+        """e.g. 'imports 310 | first_frame 820 | armed 835 ms'."""
+        parts = [f"{name} {seconds * 1000:.0f}" for name, seconds in self.marks.items()]
+        return " | ".join(parts) + " ms" if parts else ""
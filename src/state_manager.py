@@ -1,9 +1,19 @@
 import cv2
 import numpy as np
+from src.background_model import BACKGROUND_MODES, create_background_model
+from src.profiler import StageProfiler
+from src.blobs import Blobs
+from src.buffer_pool import BufferPool
+
+def _unpooled(name, shape, dtype=np.uint8):
+    return None # BufferPool.get() stand-in: let OpenCV allocate the output
 
 class StateManager:
     STATE_COLD = "COLD" # Setup/Reference mode
     STATE_HOT = "HOT"   # Active monitoring mode
+    
+    BLUR_KSIZE = 21       # Gaussian blur kernel (px)
+    DILATE_ITERATIONS = 2 # 3x3 dilation passes
 
     def __init__(self):
         self.state = self.STATE_COLD
@@ -16,6 +26,12 @@ class StateManager:
         self.threshold = 25
         self.min_area = 500
         
+        # Background engine: 'static' (single HOT reference), 'running_avg', 'mog2' or 'knn'
+        self.background_mode = "static"
+        self.learning_rate = 0.005 # Blend factor per model update
+        self.update_interval = 5   # Frames between model updates
+        self.background = None
+        
         # Logic state
         # Logic state
         self.intrusion_active = False
@@ -27,14 +43,19 @@ class StateManager:
         self.pan_x = 0
         self.pan_y = 0
         self.high_quality = False # Logic for Lanczos4 upscaling
+        self.zone_restricted = False # Only diff the zones' bounding box (see detect_changes)
+        self.detection_downscale = 1 # Detect at 1/N resolution; results are mapped back to camera pixels
         
         self.intrusion_start_time = 0 # For duration metrics
+        self.profiler = StageProfiler(enabled=False) # Replaced by the app's profiler when enabled
+        self.buffers = BufferPool() # Per-frame work images (disable to let every stage allocate)
 
     def set_cold(self):
         """Resets to COLD state."""
         self.state = self.STATE_COLD
         self.reference_frame = None
         self.reference_gray = None
+        self.background = None
         self.intrusions = 0
         self.intrusion_active = False
         self.alarm_active = False
@@ -45,54 +66,205 @@ class StateManager:
         self.state = self.STATE_HOT
         self.reference_frame = frame.copy()
         self.reference_gray = self._preprocess(frame)
+        self._reset_background()
         self.intrusion_active = False
         self.alarm_active = False
         print("[INFO] System set to HOT state. Reference captured.")
 
+    def restore_hot(self, reference_frame, reference_gray=None):
+        """
+        Sets to HOT state from a saved reference (see armed_snapshot), without copying it:
+        read-only (memory-mapped) arrays are fine, nothing writes into the reference.
+        reference_gray is rebuilt if missing or saved at another detection resolution.
+        """
+        self.state = self.STATE_HOT
+        self.reference_frame = reference_frame
+        if reference_gray is None or reference_gray.shape != self._detection_shape(reference_frame):
+            reference_gray = self._preprocess(reference_frame)
+        self.reference_gray = reference_gray
+        self._reset_background()
+        self.intrusion_active = False
+        self.alarm_active = False
+        print("[INFO] System restored to HOT state from snapshot.")
+
+    # Detection settings that can be given on the command line / in a worker config
+    SETTINGS = ("threshold", "min_area", "background_mode", "learning_rate",
+                "update_interval", "detection_downscale", "zone_restricted")
+
+    def apply_settings(self, settings):
+        """Copies the known detection settings present (and not None) in a dict."""
+        for name in self.SETTINGS:
+            if settings.get(name) is not None:
+                setattr(self, name, settings[name])
+
+    def set_background_mode(self, mode):
+        """Selects the background engine; if HOT, it is re-seeded from the current reference."""
+        if mode not in BACKGROUND_MODES:
+            raise ValueError(f"Unknown background mode: {mode}")
+        self.background_mode = mode
+        if self.reference_gray is not None:
+            self._reset_background()
+
+    def _reset_background(self):
+        self.background = create_background_model(self.background_mode, self.learning_rate, self.update_interval)
+        self.background.reset(self.reference_gray)
+
+    def set_detection_downscale(self, factor):
+        """Changes the detection resolution (1, 2, 4...); if HOT, the reference is rebuilt from the reference frame."""
+        self.detection_downscale = max(1, int(factor))
+        if self.reference_frame is not None:
+            self.reference_gray = self._preprocess(self.reference_frame)
+            self._reset_background()
+
     def is_hot(self):
         return self.state == self.STATE_HOT
 
-    def _preprocess(self, frame):
-        """Grayscale and Gaussian Blur."""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (21, 21), 0)
+    def _blur_ksize(self):
+        # The 21x21 kernel is defined at camera resolution; shrink it with the image
+        return max(3, (self.BLUR_KSIZE // self.detection_downscale) | 1)
+
+    def _detection_shape(self, frame):
+        k = self.detection_downscale
+        return (frame.shape[0] // k, frame.shape[1] // k)
+
+    def _preprocess(self, frame, pooled=False):
+        """
+        Grayscale, downscale to detection resolution and Gaussian Blur.
+        pooled: write into the buffer pool (per-frame images only, the result is overwritten next frame).
+        """
+        get = self.buffers.get if pooled else _unpooled
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=get("gray", frame.shape[:2]))
+        k = self.detection_downscale
+        if k > 1:
+            # Integer block averaging: any crop aligned to k pixels gives the same values as the full image
+            h, w = gray.shape[0] // k, gray.shape[1] // k
+            gray = gray[:h*k, :w*k]
+            # Halving steps are much cheaper than one large INTER_AREA reduction
+            step = 0
+            while k % 2 == 0:
+                step += 1
+                half = (gray.shape[0] // 2, gray.shape[1] // 2)
+                gray = cv2.resize(gray, (half[1], half[0]), dst=get(f"half{step}", half), interpolation=cv2.INTER_AREA)
+                k //= 2
+            if k > 1:
+                gray = cv2.resize(gray, (w, h), dst=get("scaled", (h, w)), interpolation=cv2.INTER_AREA)
+        ksize = self._blur_ksize()
+        blur = cv2.GaussianBlur(gray, (ksize, ksize), 0, dst=get("blur", gray.shape))
         return blur
 
-    def detect_changes(self, frame):
+    def roi_margin(self):
+        """Border (detection px) a region needs so blur + dilation inside it match the full-frame result."""
+        return self._blur_ksize() // 2 + self.DILATE_ITERATIONS
+
+    def detect_changes(self, frame, roi=None, mask=None):
         """
         Returns a list of contours that differ from reference.
         Only runs if state is HOT.
+        roi (x, y, w, h): only process this region (plus a border for the blur/dilation).
+        mask: uint8 image of the frame size; changes outside it (0) are discarded.
+        Inside the mask the result is the same as the full-frame path.
         """
-        if not self.is_hot() or self.reference_gray is None:
+        fg = self._foreground(frame, roi, mask)
+        if fg is None:
             return []
+        thresh, x0, y0 = fg
+        k = self.detection_downscale
 
-        current_gray = self._preprocess(frame)
-        
-        # Robustness: Handle Resolution Change (e.g., Zoom)
-        if self.reference_gray.shape != current_gray.shape:
-            # print(f"[WARN] Resolution changed. Recapturing reference.")
-            self.reference_gray = current_gray
+        with self.profiler.span("contours"):
+            # Find contours (shifted back to detection-frame coordinates)
+            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0))
+            
+            # min_area is in camera pixels
+            min_area = self.min_area / (k * k)
+            valid_contours = []
+            for c in contours:
+                if cv2.contourArea(c) > min_area:
+                    if k > 1:
+                        # Back to camera pixels: centre of each k x k block, (k - 1) / 2 as in
+                        # Blobs.from_mask, floored to the pixel that contains it
+                        c = c * k + (k - 1) // 2
+                    valid_contours.append(c)
+                
+        return valid_contours
+
+    def detect_blobs(self, frame, roi=None, mask=None):
+        """
+        Same detection as detect_changes, but returns a columnar Blobs result
+        (areas, bboxes, centroids in camera pixels) from one connected-components pass.
+        Areas are pixel counts, so they are slightly larger than contour areas.
+        """
+        fg = self._foreground(frame, roi, mask)
+        if fg is None:
+            return Blobs.empty()
+        thresh, x0, y0 = fg
+        with self.profiler.span("blobs"):
+            return Blobs.from_mask(thresh, (x0, y0), self.detection_downscale, self.min_area,
+                                   buffers=self.buffers if self.buffers.enabled else None)
+
+    def _foreground(self, frame, roi, mask):
+        """
+        Binary change image (detection pixels) and its top-left (x0, y0), or None if
+        not HOT or the resolution changed (the reference is then recaptured).
+        """
+        if not self.is_hot() or self.reference_gray is None:
+            return None
+
+        # Robustness: the camera came back at another resolution
+        if self.reference_gray.shape != self._detection_shape(frame):
+            print("[WARNING] Camera resolution changed. Recapturing reference.")
+            self.reference_gray = self._preprocess(frame)
             self.reference_frame = frame.copy()
-            return []
-        
-        # Absolute difference between reference and current
-        frame_delta = cv2.absdiff(self.reference_gray, current_gray)
-        
-        # Threshold to get binary image
-        _, thresh = cv2.threshold(frame_delta, self.threshold, 255, cv2.THRESH_BINARY)
+            self._reset_background()
+            return None
         
-        # Dilate to fill holes
-        thresh = cv2.dilate(thresh, None, iterations=2)
+        # Everything below works in detection pixels (camera pixels / k)
+        k = self.detection_downscale
+        det_h, det_w = self.reference_gray.shape
+        if roi is None:
+            x0, y0, x1, y1 = 0, 0, det_w, det_h
+        else:
+            # Expand by the blur/dilation border and clip to the frame
+            m = self.roi_margin()
+            x0 = max(0, roi[0] // k - m)
+            y0 = max(0, roi[1] // k - m)
+            x1 = min(det_w, -(-(roi[0] + roi[2]) // k) + m)
+            y1 = min(det_h, -(-(roi[1] + roi[3]) // k) + m)
+            if x1 <= x0 or y1 <= y0:
+                return None
+
+        profiler = self.profiler
+        buffers = self.buffers
+        with profiler.span("preprocess"):
+            current_gray = self._preprocess(frame[y0*k:y1*k, x0*k:x1*k], pooled=True)
+        region = (x0, y0, x1, y1)
         
-        # Find contours
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        with profiler.span("diff"):
+            # Difference against the background model, thresholded to a binary image
+            thresh = self.background.foreground(current_gray, region, self.threshold,
+                                                dst=buffers.get("delta", current_gray.shape))
+            
+            # Dilate to fill holes
+            thresh = cv2.dilate(thresh, None, dst=buffers.get("dilate", thresh.shape), iterations=self.DILATE_ITERATIONS)
+            
+            # Learn the scene where nothing is moving (no-op for the static reference)
+            self.background.update(current_gray, region, thresh)
+            
+            # Discard everything outside the alarm area
+            if mask is not None:
+                if k > 1:
+                    # Nearest sample (block centre) of the camera-resolution mask
+                    mask = mask[y0*k + (k - 1) // 2:y1*k:k, x0*k + (k - 1) // 2:x1*k:k]
+                    sampled = buffers.get("mask", mask.shape)
+                    if sampled is None:
+                        mask = np.ascontiguousarray(mask)
+                    else:
+                        np.copyto(sampled, mask)
+                        mask = sampled
+                else:
+                    mask = mask[y0:y1, x0:x1]
+                thresh = cv2.bitwise_and(thresh, mask, dst=thresh)
         
-        valid_contours = []
-        for c in contours:
-            if cv2.contourArea(c) > self.min_area:
-                valid_contours.append(c)
-                
-        return valid_contours
+        return thresh, x0, y0
 
     def update_intrusion_status(self, detected):
         """
@@ -107,6 +279,15 @@ class StateManager:
              # Falling edge: Intrusion cleared
              self.intrusion_active = False
 
+    def register_intrusions(self, count, active):
+        """
+        Track-driven alternative to update_intrusion_status.
+        count: tracks that entered a zone this frame (each one is a new intrusion).
+        active: True while any track is inside a zone.
+        """
+        self.intrusions += count
+        self.intrusion_active = active
+
     def increment_intrusion(self):
         # Deprecated in favor of update_intrusion_status
         pass
@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+
+class SyntheticScene:
+    """
+    Reproducible test scene: a static textured background with N discs bouncing around.
+    Used by the benchmarks so the real pipeline can be measured without a camera.
+    """
+    def __init__(self, width=1920, height=1080, blobs=5, radius=(20, 60), speed=(2, 8), noise=2.0, seed=0):
+        self.width = width
+        self.height = height
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+
+        # Low-frequency texture upscaled to the full size (like a real room, not white noise)
+        small = self.rng.integers(40, 200, size=(max(2, height // 40), max(2, width // 40), 3), dtype=np.uint8)
+        self.background = cv2.GaussianBlur(cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC), (0, 0), 3)
+
+        self.radius = self.rng.integers(radius[0], radius[1] + 1, size=blobs)
+        self.pos = np.column_stack([
+            self.rng.uniform(self.radius, width - self.radius),
+            self.rng.uniform(self.radius, height - self.radius),
+        ])
+        angle = self.rng.uniform(0, 2 * np.pi, size=blobs)
+        mag = self.rng.uniform(speed[0], speed[1], size=blobs)
+        self.vel = np.column_stack([np.cos(angle) * mag, np.sin(angle) * mag])
+        # Dark or bright blobs so they stand out from the mid-grey texture
+        self.colors = np.where(self.rng.random((blobs, 1)) < 0.5,
+                               self.rng.integers(0, 30, size=(blobs, 3)),
+                               self.rng.integers(225, 256, size=(blobs, 3)))
+        self.frame_index = 0
+
+    def reference_frame(self):
+        """Background without blobs (what an operator would arm on)."""
+        return self.background.copy()
+
+    def next_frame(self):
+        """Returns (frame, truth) where truth is an (N, 3) array of blob x, y, radius."""
+        # Move and bounce off the borders
+        self.pos += self.vel
+        for axis, limit in ((0, self.width), (1, self.height)):
+            low = self.pos[:, axis] < self.radius
+            high = self.pos[:, axis] > limit - self.radius
+            self.vel[low | high, axis] *= -1
+            self.pos[:, axis] = np.clip(self.pos[:, axis], self.radius, limit - self.radius)
+
+        frame = self.background.copy()
+        for (x, y), r, color in zip(self.pos, self.radius, self.colors):
+            cv2.circle(frame, (int(x), int(y)), int(r), tuple(int(c) for c in color), -1)
+        if self.noise > 0:
+            sensor = self.rng.normal(0, self.noise, size=frame.shape).astype(np.int16)
+            frame = np.clip(frame.astype(np.int16) + sensor, 0, 255).astype(np.uint8)
+
+        self.frame_index += 1
+        truth = np.column_stack([self.pos, self.radius]).astype(np.float32)
+        return frame, truth
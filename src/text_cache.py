@@ -0,0 +1,103 @@
+from collections import OrderedDict
+import numpy as np
+
+class TextSprite:
+    """Pre-rendered text: alpha mask plus premultiplied colour, ready to blend into a BGR image."""
+    __slots__ = ('dx', 'dy', 'inv_alpha', 'premul', 'advance', 'work')
+
+    def __init__(self, alpha, color, dx, dy, advance):
+        a = alpha.astype(np.uint16)[:, :, None]
+        self.inv_alpha = 255 - a
+        self.premul = a * np.array(color, dtype=np.uint16)
+        self.dx = dx # Offset of the mask from the text origin
+        self.dy = dy
+        self.advance = advance # Pen advance (used by the per-glyph path)
+        self.work = np.empty(self.premul.shape, dtype=np.uint16) # Blend scratch, reused by every blit
+
+    def blit(self, img, x, y):
+        """Alpha-blends the sprite at text origin (x, y) (top-left of the line), clipped to img."""
+        h, w = self.inv_alpha.shape[:2]
+        x0, y0 = x + self.dx, y + self.dy
+        ix0, iy0 = max(0, x0), max(0, y0)
+        ix1, iy1 = min(img.shape[1], x0 + w), min(img.shape[0], y0 + h)
+        if ix1 <= ix0 or iy1 <= iy0:
+            return
+        sx, sy = ix0 - x0, iy0 - y0
+        inv = self.inv_alpha[sy:sy + iy1 - iy0, sx:sx + ix1 - ix0]
+        premul = self.premul[sy:sy + iy1 - iy0, sx:sx + ix1 - ix0]
+        roi = img[iy0:iy1, ix0:ix1]
+        work = self.work[sy:sy + iy1 - iy0, sx:sx + ix1 - ix0]
+        np.multiply(roi, inv, out=work)
+        work += premul
+        work += 127
+        work //= 255
+        roi[:] = work
+
+
+class TextSpriteCache:
+    """
+    Renders UTF-8 text with PIL once per (text, size, colour) into a small alpha sprite,
+    kept in a bounded LRU. Fonts are loaded once per size.
+    """
+    def __init__(self, max_entries=256, font_paths=("C:/Windows/Fonts/arial.ttf", "arial.ttf")):
+        self.max_entries = max_entries
+        self.font_paths = font_paths
+        self._fonts = {}
+        self._sprites = OrderedDict()
+        self._glyphs = OrderedDict()
+
+    def get_font(self, size):
+        font = self._fonts.get(size)
+        if font is None:
+            from PIL import ImageFont
+            font = None
+            for path in self.font_paths:
+                try:
+                    font = ImageFont.truetype(path, size)
+                    break
+                except Exception:
+                    continue
+            if font is None:
+                font = ImageFont.load_default()
+            self._fonts[size] = font
+        return font
+
+    def preload(self, sizes):
+        """Imports PIL and loads the fonts of 'sizes' ahead of the first draw (safe from another thread)."""
+        for size in sizes:
+            self.get_font(size)
+
+    def _render(self, text, size, color):
+        from PIL import Image, ImageDraw
+        font = self.get_font(size)
+        left, top, right, bottom = font.getbbox(text)
+        mask = Image.new("L", (max(1, right - left), max(1, bottom - top)), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+        return TextSprite(np.asarray(mask), color, left, top, font.getlength(text))
+
+    def _lookup(self, cache, key):
+        sprite = cache.get(key)
+        if sprite is None:
+            sprite = self._render(*key)
+            cache[key] = sprite
+            if len(cache) > self.max_entries:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return sprite
+
+    def draw(self, img, text, pos, size, color):
+        """Draws 'text' with its top-left line origin at pos (BGR colour)."""
+        self._lookup(self._sprites, (text, size, tuple(color))).blit(img, pos[0], pos[1])
+
+    def draw_glyphs(self, img, text, pos, size, color):
+        """
+        Same as draw(), but composed from cached single-character sprites.
+        For text that changes every frame (counters), so the cache is not flooded.
+        """
+        x = float(pos[0])
+        color = tuple(color)
+        for ch in text:
+            glyph = self._lookup(self._glyphs, (ch, size, color))
+            glyph.blit(img, int(round(x)), pos[1])
+            x += glyph.advance
@@ -0,0 +1,163 @@
+import time
+
+import numpy as np
+
+class CentroidTracker:
+    """
+    Lightweight multi-object tracker on blob centroids (camera pixels).
+    Tracks are matched to detections by mutual nearest neighbour on a distance matrix
+    (a few vectorized rounds, no per-pair Python loop), using a constant-velocity
+    prediction. A track is confirmed after 'min_hits' detections and dropped after
+    'max_missed' frames without one, so a person flickering in and out of detection
+    keeps the same ID. A zone change needs 'zone_frames' consecutive detections in the
+    new zone, so a centroid jittering on a zone border does not re-enter every frame.
+
+    update() returns zone events for confirmed tracks:
+        {'type': 'ENTER', 'track', 'zone', 'time'}
+        {'type': 'EXIT', 'track', 'zone', 'time', 'dwell'}
+    and total dwell seconds per zone are kept in 'dwell_totals'.
+    """
+    def __init__(self, max_distance=120.0, max_missed=10, min_hits=2, zone_frames=3, match_rounds=3):
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.zone_frames = zone_frames
+        self.match_rounds = match_rounds
+        self.next_id = 1
+        self.reset()
+
+    def reset(self):
+        """Drops every track (no EXIT events are produced)."""
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))
+        self.areas = np.zeros(0)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.missed = np.zeros(0, dtype=np.int64)
+        self.zones = np.zeros(0, dtype=np.int64)         # Current zone (0 = none), confirmed tracks only
+        self.zone_since = np.zeros(0)                     # Monotonic time the current zone was entered
+        self.pending = np.zeros(0, dtype=np.int64)        # Zone the track is moving to (hysteresis)
+        self.pending_count = np.zeros(0, dtype=np.int64)  # Consecutive detections in 'pending'
+        self.dwell_totals = {}
+
+    def _match(self, predicted, centroids):
+        """Returns (track_idx, det_idx) arrays of matched pairs."""
+        m, n = len(predicted), len(centroids)
+        if m == 0 or n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        dist = np.linalg.norm(predicted[:, None, :] - centroids[None, :, :], axis=2)
+        dist[dist > self.max_distance] = np.inf
+        rows, cols = [], []
+        for _ in range(self.match_rounds):
+            best_det = dist.argmin(axis=1)
+            best_track = dist.argmin(axis=0)
+            tracks = np.arange(m)
+            mutual = (best_track[best_det] == tracks) & np.isfinite(dist[tracks, best_det])
+            if not mutual.any():
+                break
+            t, d = tracks[mutual], best_det[mutual]
+            rows.append(t)
+            cols.append(d)
+            dist[t, :] = np.inf
+            dist[:, d] = np.inf
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def update(self, centroids, zone_ids, areas=None, timestamp=None):
+        """
+        centroids (N, 2) camera pixels, zone_ids (N,) zone of each detection (0 = none).
+        Returns the list of ENTER / EXIT events of this frame.
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        wall = time.time()
+        centroids = np.asarray(centroids, dtype=np.float64).reshape(-1, 2)
+        zone_ids = np.asarray(zone_ids, dtype=np.int64).reshape(-1)
+        areas = np.zeros(len(centroids)) if areas is None else np.asarray(areas, dtype=np.float64)
+        events = []
+
+        predicted = self.positions + self.velocities
+        t_idx, d_idx = self._match(predicted, centroids)
+
+        # Matched tracks
+        self.velocities[t_idx] = 0.5 * self.velocities[t_idx] + 0.5 * (centroids[d_idx] - self.positions[t_idx])
+        self.positions[t_idx] = centroids[d_idx]
+        self.areas[t_idx] = areas[d_idx]
+        self.hits[t_idx] += 1
+        self.missed[t_idx] = 0
+
+        # Unmatched tracks coast on their prediction
+        unmatched = np.ones(len(self.ids), dtype=bool)
+        unmatched[t_idx] = False
+        self.missed[unmatched] += 1
+        self.positions[unmatched] = predicted[unmatched]
+
+        # New tentative tracks for unmatched detections
+        new = np.ones(len(centroids), dtype=bool)
+        new[d_idx] = False
+        new_det = np.nonzero(new)[0]
+        count = len(new_det)
+        if count:
+            first = len(self.ids)
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count)])
+            self.next_id += count
+            self.positions = np.concatenate([self.positions, centroids[new_det]])
+            self.velocities = np.concatenate([self.velocities, np.zeros((count, 2))])
+            self.areas = np.concatenate([self.areas, areas[new_det]])
+            self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int64)])
+            self.missed = np.concatenate([self.missed, np.zeros(count, dtype=np.int64)])
+            self.zones = np.concatenate([self.zones, np.zeros(count, dtype=np.int64)])
+            self.zone_since = np.concatenate([self.zone_since, np.zeros(count)])
+            self.pending = np.concatenate([self.pending, np.zeros(count, dtype=np.int64)])
+            self.pending_count = np.concatenate([self.pending_count, np.zeros(count, dtype=np.int64)])
+            t_idx = np.concatenate([t_idx, np.arange(first, first + count)])
+            d_idx = np.concatenate([d_idx, new_det])
+
+        # Zone changes of tracks seen this frame, once stable for 'zone_frames' detections
+        observed = zone_ids[d_idx]
+        same = self.pending[t_idx] == observed
+        self.pending_count[t_idx] = np.where(same, self.pending_count[t_idx] + 1, 1)
+        self.pending[t_idx] = observed
+        confirmed = self.hits[t_idx] >= self.min_hits
+        changed = confirmed & (self.zones[t_idx] != observed) & (self.pending_count[t_idx] >= self.zone_frames)
+        for t, zone in zip(t_idx[changed], observed[changed]):
+            if self.zones[t]:
+                events.append(self._exit(t, now, wall))
+            if zone:
+                self.zones[t] = zone
+                self.zone_since[t] = now
+                events.append({'type': 'ENTER', 'track': int(self.ids[t]), 'zone': int(zone), 'time': wall})
+
+        # Expired tracks leave their zone
+        expired = self.missed > self.max_missed
+        for t in np.nonzero(expired & (self.zones > 0))[0]:
+            events.append(self._exit(t, now, wall))
+        if expired.any():
+            keep = ~expired
+            self.ids, self.positions, self.velocities = self.ids[keep], self.positions[keep], self.velocities[keep]
+            self.areas, self.hits, self.missed = self.areas[keep], self.hits[keep], self.missed[keep]
+            self.zones, self.zone_since = self.zones[keep], self.zone_since[keep]
+            self.pending, self.pending_count = self.pending[keep], self.pending_count[keep]
+        return events
+
+    def _exit(self, t, now, wall):
+        zone = int(self.zones[t])
+        dwell = float(now - self.zone_since[t])
+        self.dwell_totals[zone] = self.dwell_totals.get(zone, 0.0) + dwell
+        self.zones[t] = 0
+        return {'type': 'EXIT', 'track': int(self.ids[t]), 'zone': zone, 'time': wall, 'dwell': dwell}
+
+    def active(self):
+        """Confirmed tracks seen recently, as (ids, positions, zones) arrays."""
+        alive = (self.hits >= self.min_hits) & (self.missed == 0)
+        return self.ids[alive], self.positions[alive], self.zones[alive]
+
+    def in_zone(self):
+        """True if any confirmed track is currently inside a zone."""
+        return bool((self.zones > 0).any())
+
+    def dwell(self, timestamp=None):
+        """Seconds each track has currently been in its zone: {track_id: (zone, seconds)}."""
+        now = time.monotonic() if timestamp is None else timestamp
+        inside = np.nonzero(self.zones > 0)[0]
+        return {int(self.ids[t]): (int(self.zones[t]), float(now - self.zone_since[t])) for t in inside}
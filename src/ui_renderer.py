@@ -1,7 +1,34 @@
+import threading
+
 import cv2
 import numpy as np
+from src.text_cache import TextSpriteCache
+
+class ViewTransform:
+    """Camera Space -> video slot pixels: the zoom/pan crop at (ox, oy), scaled by (sx, sy)."""
+    __slots__ = ('ox', 'oy', 'sx', 'sy')
+
+    def __init__(self, ox=0, oy=0, sx=1.0, sy=1.0):
+        self.ox = ox
+        self.oy = oy
+        self.sx = sx
+        self.sy = sy
+
+    def key(self):
+        return (self.ox, self.oy, self.sx, self.sy)
+
+    def points(self, pts):
+        """Camera points (..., 2) -> int32 display points."""
+        pts = np.asarray(pts, dtype=np.float64)
+        return np.rint((pts - (self.ox, self.oy)) * (self.sx, self.sy)).astype(np.int32)
+
+    def point(self, x, y):
+        return (int(round((x - self.ox) * self.sx)), int(round((y - self.oy) * self.sy)))
+
 
 class UIRenderer:
+    FONT_SIZES = (11, 12) # Sizes used with draw_text_pil / draw_text_glyphs
+
     def __init__(self):
         self.font = cv2.FONT_HERSHEY_SIMPLEX
         # Colors (BGR)
@@ -17,7 +44,22 @@ class UIRenderer:
         self.VIDEO_RECT = (20, 50, 860, 484) # x, y, w, h
         self.UI_START_X = 900
         
+        self.LOGS_RECT = (self.UI_START_X, 530, 360, 180)
+        self.CONTROLS_RECT = (self.UI_START_X, 60, 361, 451)
+        
         self.hitboxes = []
+        self.video_transform = ViewTransform() # Camera Space -> video slot of the last draw_video()
+        self.text_cache = TextSpriteCache()
+        # PIL import and font loading (tens of ms) off the startup path, before the first log draw
+        threading.Thread(target=self.text_cache.preload, args=(self.FONT_SIZES,), name="font-preload", daemon=True).start()
+        
+        # Cached layers: static background, plus keys of what is currently drawn on the canvas
+        self._static = None
+        self._canvas_id = None
+        self._controls_key = None
+        self._logs_key = None
+        self._zone_layer = None
+        self._zone_layer_key = None
 
     def draw_dashboard_frame(self, frame_w=1280, frame_h=720):
         """Creates the base canvas."""
@@ -35,51 +77,113 @@ class UIRenderer:
 
         return canvas
 
-    def render(self, canvas, video_frame, state_manager, log_manager, metrics_data):
-        self.hitboxes = [] # Reset hitboxes
-        
-        # 1. Draw Dashboard Background
-        canvas[:] = self.C_BG
-        self.draw_dashboard_frame(canvas)
+    def _build_static_layer(self, shape):
+        """Everything that never changes: background, header, video border, panel backgrounds."""
+        static = np.empty(shape, dtype=np.uint8)
+        static[:] = self.C_BG
+        self.draw_dashboard_frame(static)
+        
+        x, y, w_panel, h_panel = self.LOGS_RECT
+        cv2.rectangle(static, (x, y), (x+w_panel, y+h_panel), (40, 40, 40), -1)
+        self.draw_text_pil(static, "LOGS DEL SISTEMA", (x+10, y+20), 12, (150, 150, 255))
+        return static
+
+    def _restore(self, canvas, rect):
+        """Copies a region of the static layer back onto the canvas."""
+        x, y, w, h = rect
+        canvas[y:y+h, x:x+w] = self._static[y:y+h, x:x+w]
 
-        # 2. Draw Video (Aspect Ratio Safe)
+    def _clear(self, canvas, rect, color):
+        """Restores a region from the static layer, or fills it with 'color' if there is none."""
+        if self._static is not None and self._static.shape == canvas.shape and self._canvas_id == id(canvas):
+            self._restore(canvas, rect)
+        else:
+            x, y, w, h = rect
+            canvas[y:y+h, x:x+w] = color
+
+    def invalidate(self):
+        """Forces a full repaint on the next render."""
+        self._static = None
+
+    def _ensure_static(self, canvas):
+        """Static Background (only repainted for a new canvas)."""
+        if self._static is None or self._static.shape != canvas.shape or self._canvas_id != id(canvas):
+            self._static = self._build_static_layer(canvas.shape)
+            canvas[:] = self._static
+            self._canvas_id = id(canvas)
+            self._controls_key = None
+            self._logs_key = None
+
+    def draw_video(self, canvas, frame, view=None, high_quality=False):
+        """
+        Crops 'frame' to view (x, y, w, h; None = whole frame) and scales it straight into the
+        video slot (aspect ratio kept): one resize reading the crop in place, no intermediate
+        image. Returns the slot (a view of the canvas) for overlays drawn at display
+        resolution; self.video_transform maps Camera Space onto it.
+        """
+        self._ensure_static(canvas)
         vx, vy, vw, vh = self.VIDEO_RECT
-        if video_frame is not None:
-            # Aspect Ratio Logic
-            h_img, w_img = video_frame.shape[:2]
-            aspect_ratio_img = w_img / h_img
-            aspect_ratio_slot = vw / vh
-            
-            if aspect_ratio_img > aspect_ratio_slot:
-                # Image is wider than slot (limit by width)
-                final_w = vw
-                final_h = int(vw / aspect_ratio_img)
-                offset_y = (vh - final_h) // 2
-                offset_x = 0
-            else:
-                # Image is taller than slot (limit by height)
-                final_h = vh
-                final_w = int(vh * aspect_ratio_img)
-                offset_x = (vw - final_w) // 2
-                offset_y = 0
-            
-            # Store the actual video area for mouse mapping
-            self.current_video_area = (vx + offset_x, vy + offset_y, final_w, final_h)
+        # Clear the slot, letterbox bars and the alarm border band around it
+        self._restore(canvas, (vx-8, vy-8, vw+16, vh+16))
+        if view is None:
+            view = (0, 0, frame.shape[1], frame.shape[0])
+        crop_x, crop_y, w_img, h_img = view
 
-            interp = cv2.INTER_LANCZOS4 if state_manager.high_quality else cv2.INTER_LINEAR
-            try:
-                resized = cv2.resize(video_frame, (final_w, final_h), interpolation=interp)
-                canvas[vy+offset_y:vy+offset_y+final_h, vx+offset_x:vx+offset_x+final_w] = resized
-            except Exception as e:
-                print(f"Resize Error: {e}")
+        # Aspect Ratio Logic
+        aspect_ratio_img = w_img / h_img
+        aspect_ratio_slot = vw / vh
+        if aspect_ratio_img > aspect_ratio_slot:
+            # Image is wider than slot (limit by width)
+            final_w = vw
+            final_h = int(vw / aspect_ratio_img)
+            offset_y = (vh - final_h) // 2
+            offset_x = 0
+        else:
+            # Image is taller than slot (limit by height)
+            final_h = vh
+            final_w = int(vh * aspect_ratio_img)
+            offset_x = (vw - final_w) // 2
+            offset_y = 0
 
-        # 3. Draw Controls
-        self._draw_controls(canvas, state_manager)
-        
-        # 4. Logs & Metrics
-        self._draw_logs_metrics(canvas, log_manager, metrics_data)
-        
-        # 5. Status
+        # Store the actual video area for mouse mapping
+        self.current_video_area = (vx + offset_x, vy + offset_y, final_w, final_h)
+        self.video_transform = ViewTransform(crop_x, crop_y, final_w / w_img, final_h / h_img)
+
+        video = canvas[vy+offset_y:vy+offset_y+final_h, vx+offset_x:vx+offset_x+final_w]
+        interp = cv2.INTER_LANCZOS4 if high_quality else cv2.INTER_LINEAR
+        try:
+            cv2.resize(frame[crop_y:crop_y+h_img, crop_x:crop_x+w_img], (final_w, final_h), dst=video, interpolation=interp)
+        except Exception as e:
+            print(f"Resize Error: {e}")
+        return video
+
+    def render(self, canvas, video_frame, state_manager, log_manager, metrics_data):
+        # 1. Static Background (only repainted for a new canvas)
+        self._ensure_static(canvas)
+
+        # 2. Video: the dashboard draws it beforehand with draw_video() (and its overlays on top);
+        # a frame given here is shown whole
+        if video_frame is not None:
+            self.draw_video(canvas, video_frame, None, state_manager.high_quality)
+        vx, vy, vw, vh = self.VIDEO_RECT
+
+        # 3. Draw Controls (only when one of their inputs changed)
+        controls_key = (state_manager.is_hot(), state_manager.threshold, state_manager.min_area,
+                        state_manager.zoom_level, state_manager.use_gpu, state_manager.high_quality,
+                        state_manager.zone_restricted)
+        if controls_key != self._controls_key:
+            self._restore(canvas, self.CONTROLS_RECT)
+            self.hitboxes = []
+            self._draw_controls(canvas, state_manager)
+            self._controls_key = controls_key
+        
+        # 4. Logs (when they change) & Metrics (every frame)
+        self._draw_log_lines(canvas, log_manager)
+        self._draw_metrics_line(canvas, metrics_data)
+        
+        # 5. Status (area under the video is also used by the mode overlay in main)
+        status_y = vy + vh + 8
+        self._restore(canvas, (0, status_y, self.UI_START_X, canvas.shape[0] - status_y))
         self._draw_status_bar(canvas, state_manager)
         
         return self.hitboxes
@@ -152,6 +256,10 @@ class UIRenderer:
         # HQ
         hq_color = (0, 100, 0) if state_manager.high_quality else (50, 50, 50)
         self._draw_button(canvas, "HQ ON" if state_manager.high_quality else "HQ OFF", x_start + 125, tog_y, 105, 30, hq_color, "TOGGLE_HQ")
+
+        # Zone-restricted detection
+        zone_color = (0, 100, 0) if state_manager.zone_restricted else (50, 50, 50)
+        self._draw_button(canvas, "ZONAS ON" if state_manager.zone_restricted else "ZONAS OFF", x_start + 240, tog_y, 105, 30, zone_color, "TOGGLE_ZONE_ONLY")
         
         # Save/Load/Exit Row
         sys_y = tog_y + 50
@@ -198,16 +306,27 @@ class UIRenderer:
         self.hitboxes.append({'action': action, 'rect': (x, y, x+w, y+h)})
 
     def _draw_logs_metrics(self, canvas, log_manager, metrics):
-        x = self.UI_START_X
-        y = 530
-        w_panel = 360
-        h_panel = 180
+        x, y, w_panel, h_panel = self.LOGS_RECT
         
         cv2.rectangle(canvas, (x, y), (x+w_panel, y+h_panel), (40, 40, 40), -1)
         self.draw_text_pil(canvas, "LOGS DEL SISTEMA", (x+10, y+20), 12, (150, 150, 255))
         
+        self._logs_key = None
+        self._draw_log_lines(canvas, log_manager)
+        self._draw_metrics_line(canvas, metrics)
+
+    def _draw_log_lines(self, canvas, log_manager):
+        x, y, w_panel, h_panel = self.LOGS_RECT
+        logs = log_manager.get_logs()[:6]
+        logs_key = tuple((log['time'], log['type'], log['msg']) for log in logs)
+        if logs_key == self._logs_key:
+            return
+        self._logs_key = logs_key
+        
+        # Clear the lines area (long lines may run past the panel edge)
+        self._clear(canvas, (x, y+28, canvas.shape[1] - x, h_panel - 58), (40, 40, 40))
+        
         log_y_start = y + 45
-        logs = log_manager.get_logs()
         for i, log in enumerate(logs):
             if i > 5: break
             color = self.C_TEXT
@@ -218,56 +337,30 @@ class UIRenderer:
             # Use PIL for utf-8 support
             self.draw_text_pil(canvas, line, (x+10, log_y_start + i*20), 11, color)
 
+    def _draw_metrics_line(self, canvas, metrics):
+        x, y, w_panel, h_panel = self.LOGS_RECT
+        self._clear(canvas, (x, y+h_panel-30, canvas.shape[1] - x, 30), (40, 40, 40))
+        
         # Metrics at bottom of log panel
         met_y = y + h_panel - 15
         fps = metrics.get('fps', 0)
         lat = metrics.get('latency', 0)
         proc = metrics.get('proc', 'CPU')
-        # Metrics are usually ASCII, keep cv2 for speed or simple consistency? 
-        # Let's use PIL for consistency in this panel.
-        self.draw_text_pil(canvas, f"FPS: {fps:.0f} | LAT: {lat:.1f}ms | {proc}", (x+10, met_y), 12, self.C_YELLOW)
+        # Changes every frame: per-glyph sprites instead of one sprite per string
+        self.draw_text_glyphs(canvas, f"FPS: {fps:.0f} | LAT: {lat:.1f}ms | {proc}", (x+10, met_y), 12, self.C_YELLOW)
 
     def draw_text_pil(self, img, text, pos, size, color):
         """
         Draws text using PIL to support UTF-8 (Accents).
         img: Numpy array (BGR)
+        pos is (x, y) like cv2.putText (bottom-left); PIL draws from the top-left, so y - size.
+        Each (text, size, color) is rendered once and alpha-blended only into its own rectangle.
         """
-        from PIL import Image, ImageDraw, ImageFont
-        
-        # Convert to PIL (RGB)
-        pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-        draw = ImageDraw.Draw(pil_img)
-        
-        # Load Font (Try Arial, fallback to default)
-        try:
-             # Windows Path
-             font = ImageFont.truetype("C:/Windows/Fonts/arial.ttf", size)
-        except:
-             try:
-                 font = ImageFont.truetype("arial.ttf", size)
-             except:
-                 font = ImageFont.load_default()
-        
-        # PIL uses RGB
-        # color is BGR, convert to RGB
-        rgb_color = (color[2], color[1], color[0])
-        
-        # Draw
-        # pos is (x, y) - cv2 uses bottom-left, PIL uses top-left usually? 
-        # Check: cv2 putText (x,y) is bottom-left of text string.
-        # PIL text (x,y) is top-left.
-        # We need to adjust y.
-        # Approximate baseline adjustment: y - size
-        draw.text((pos[0], pos[1] - size), text, font=font, fill=rgb_color)
-        
-        # Convert back to Numpy (BGR)
-        # Note: This copy overhead is acceptable for UI
-        np_img = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-        
-        # Copy back to reference. 
-        # Better: we can't replace 'img' reference in-place easily like this if we re-alloc.
-        # We must copy content back into 'img'.
-        np.copyto(img, np_img)
+        self.text_cache.draw(img, text, (pos[0], pos[1] - size), size, color)
+
+    def draw_text_glyphs(self, img, text, pos, size, color):
+        """draw_text_pil for text that changes every frame (FPS/latency): composed from cached glyphs."""
+        self.text_cache.draw_glyphs(img, text, (pos[0], pos[1] - size), size, color)
 
     def _draw_status_bar(self, canvas, state_manager):
         # Bottom Left under video
@@ -282,6 +375,42 @@ class UIRenderer:
         if state_manager.is_hot():
              cv2.putText(canvas, f"INTRUSIONES: {state_manager.intrusions}", (x, y+40), self.font, 0.8, (200, 200, 200), 2)
 
+    def render_camera_grid(self, canvas, tiles, log_manager, metrics_data):
+        """
+        Mosaic view for the multi-camera supervisor.
+        tiles: list of dicts with 'image' (BGR or None), 'label', 'hot', 'intrusion', 'intrusions', 'fps'
+        """
+        canvas[:] = self.C_BG
+        self.draw_dashboard_frame(canvas)
+
+        vx, vy, vw, vh = self.VIDEO_RECT
+        n = max(1, len(tiles))
+        cols = int(np.ceil(np.sqrt(n)))
+        rows = int(np.ceil(n / cols))
+        tile_w = vw // cols
+        tile_h = vh // rows
+
+        for i, tile in enumerate(tiles):
+            tx = vx + (i % cols) * tile_w
+            ty = vy + (i // cols) * tile_h
+            img = tile.get('image')
+            if img is not None:
+                resized = cv2.resize(img, (tile_w - 4, tile_h - 4), interpolation=cv2.INTER_LINEAR)
+                canvas[ty+2:ty+tile_h-2, tx+2:tx+tile_w-2] = resized
+            else:
+                cv2.putText(canvas, "SIN SEÑAL", (tx + 10, ty + tile_h // 2), self.font, 0.6, self.C_TEXT, 1)
+
+            border = (0, 0, 255) if tile.get('intrusion') else (80, 80, 80)
+            cv2.rectangle(canvas, (tx, ty), (tx + tile_w - 1, ty + tile_h - 1), border, 2)
+
+            state_str = "HOT" if tile.get('hot') else "COLD"
+            label = f"{tile.get('label', i)} | {state_str} | INT: {tile.get('intrusions', 0)} | {tile.get('fps', 0):.0f} FPS"
+            cv2.rectangle(canvas, (tx + 2, ty + 2), (tx + tile_w - 2, ty + 20), (20, 20, 20), -1)
+            cv2.putText(canvas, label, (tx + 6, ty + 16), self.font, 0.4, self.C_TEXT, 1)
+
+        self._draw_logs_metrics(canvas, log_manager, metrics_data)
+        cv2.putText(canvas, "[H] Armar todas  [C] Desarmar todas  [Q] Salir", (20, 600), self.font, 0.6, self.C_TEXT, 1)
+
     def trigger_visual_alarm(self, canvas):
         # Flashing Border on Video
         if hasattr(self, 'current_video_area'):
@@ -289,43 +418,88 @@ class UIRenderer:
             cv2.rectangle(canvas, (vx-5, vy-5), (vx+vw+5, vy+vh+5), (0, 0, 255), 5)
             cv2.putText(canvas, "ALERTA DE INTRUSO", (vx + 20, vy + 50), self.font, 1.5, (0, 0, 255), 3)
 
-    def draw_zones_on_video(self, video_frame, zone_manager, app_state):
-        # This draws ON THE VIDEO FRAME BEFORE RESIZING
-        # This is correct because points are in Camera Space -> Crop Space
-        for zone in zone_manager.get_zones():
-            pts = []
-            for pt in zone:
-                # Adjust for crop offset (image space -> crop space)
-                cx = pt[0] - app_state.offset_x
-                cy = pt[1] - app_state.offset_y
-                pts.append([cx, cy])
-            
-            pts_arr = np.array(pts, dtype=np.int32)
-            cv2.polylines(video_frame, [pts_arr], True, (0, 0, 255), 2)
-            
-            # Use semi-transparent overlay
-            overlay = video_frame.copy()
-            cv2.fillPoly(overlay, [pts_arr], (0, 0, 100))
-            cv2.addWeighted(overlay, 0.4, video_frame, 0.6, 0, video_frame)
-            
+    def _build_zone_layer(self, zone_manager, transform, size):
+        """
+        Zone outlines and fill for one (zones version, view transform, video size), cropped to the
+        zones' bounding box: (x0, y0, fill mask, outline mask, fill colour, outline colour, blend
+        buffer) or None.
+        """
+        w, h = size
+        pts = [transform.points(zone).reshape(-1, 1, 2) for zone in zone_manager.get_zones()]
+        if not pts:
+            return None
+
+        fill = np.zeros((h, w), dtype=np.uint8)
+        outline = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(fill, pts, 255)
+        cv2.polylines(outline, pts, True, 255, 2)
+
+        ys, xs = np.nonzero(fill | outline)
+        if len(xs) == 0:
+            return None # Zones are outside the current view
+        x0, x1, y0, y1 = xs.min(), xs.max() + 1, ys.min(), ys.max() + 1
+
+        fill_mask = np.ascontiguousarray(fill[y0:y1, x0:x1])
+        outline_mask = np.ascontiguousarray(outline[y0:y1, x0:x1])
+        color_layer = np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        color_layer[:] = (0, 0, 100)
+        outline_layer = np.empty_like(color_layer)
+        outline_layer[:] = (0, 0, 255)
+        return (x0, y0, fill_mask, outline_mask, color_layer, outline_layer, np.empty_like(color_layer))
+
+    def draw_zones_on_video(self, video_frame, zone_manager, transform=None):
+        # Zone points are in Camera Space; 'transform' maps them onto video_frame
+        # (the video slot from draw_video(); default: video_frame is the camera frame)
+        transform = transform or ViewTransform()
+        h, w = video_frame.shape[:2]
+        key = (zone_manager.version, transform.key(), (w, h))
+        if self._zone_layer_key != key:
+            self._zone_layer = self._build_zone_layer(zone_manager, transform, (w, h))
+            self._zone_layer_key = key
+
+        if self._zone_layer is not None:
+            x0, y0, fill_mask, outline_mask, color_layer, outline_layer, blended = self._zone_layer
+            roi = video_frame[y0:y0+fill_mask.shape[0], x0:x0+fill_mask.shape[1]]
+            # Outline first, then one semi-transparent blend written back to the zone pixels only
+            cv2.copyTo(outline_layer, outline_mask, roi)
+            cv2.addWeighted(color_layer, 0.4, roi, 0.6, 0, dst=blended)
+            cv2.copyTo(blended, fill_mask, roi)
+
         # Draw active drawing
         curr = zone_manager.get_current_zone_points()
         if len(curr) > 0:
-            pts = []
-            for pt in curr:
-                cx = pt[0] - app_state.offset_x
-                cy = pt[1] - app_state.offset_y
-                pts.append([cx, cy])
-            pts_arr = np.array(pts, dtype=np.int32)
+            pts_arr = transform.points(curr)
             
-            if len(pts) > 1:
+            if len(pts_arr) > 1:
                 cv2.polylines(video_frame, [pts_arr], False, (0, 255, 255), 2)
-            for pt in pts:
-                cv2.circle(video_frame, (pt[0], pt[1]), 3, (0, 255, 255), -1)
+            for pt in pts_arr:
+                cv2.circle(video_frame, (int(pt[0]), int(pt[1])), 3, (0, 255, 255), -1)
 
     def draw_detections(self, frame, contours):
         for c in contours:
             x, y, w, h = cv2.boundingRect(c)
             cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
 
+    def draw_blobs(self, frame, blobs, transform=None):
+        """Bounding boxes of a Blobs result, all in one polylines call (transform: see draw_zones_on_video)."""
+        if len(blobs) > 0:
+            corners = blobs.corners()
+            if transform is not None:
+                corners = transform.points(corners)
+            cv2.polylines(frame, list(corners), True, (0, 255, 0), 2)
+
+    def draw_tracks(self, frame, tracks, transform=None):
+        """Track IDs next to their positions; tracks = (ids, positions, zones) from DetectionPipeline."""
+        transform = transform or ViewTransform()
+        for track_id, (x, y), zone in zip(*tracks):
+            color = (0, 0, 255) if zone else (0, 255, 255)
+            px, py = transform.point(x, y)
+            cv2.putText(frame, f"#{track_id}", (px + 12, py - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+
+    def draw_hits(self, frame, hits, transform=None):
+        """Filled marker on the centroid of every blob inside a zone."""
+        transform = transform or ViewTransform()
+        for x, y in hits:
+            cv2.circle(frame, transform.point(x, y), 7, (0, 0, 255), -1)
+
 
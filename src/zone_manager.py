@@ -9,6 +9,13 @@ class ZoneManager:
         self.current_zone = [] # Temporary list of points for the zone being drawn
         self.zone_types = [] # Could be 'forbidden', 'safe'. For now assuming all are forbidden as per prompt logic primarily.
         
+        # Compiled label raster: 0 = no zone, N = zone N (index + 1). Rebuilt only when zones or size change.
+        self.version = 0 # Bumped on every zone change
+        self._raster = None
+        self._raster_key = None
+        self._mask = None
+        self._mask_key = None
+        
     def add_point(self, x, y):
         """Adds a point to the current zone being drawn."""
         self.current_zone.append([x, y])
@@ -18,6 +25,7 @@ class ZoneManager:
         if len(self.current_zone) > 2:
             self.zones.append(np.array(self.current_zone, dtype=np.int32))
             self.current_zone = []
+            self.version += 1
             return True
         self.current_zone = []
         return False
@@ -28,6 +36,7 @@ class ZoneManager:
     def clear_all_zones(self):
         self.zones = []
         self.current_zone = []
+        self.version += 1
 
     def get_zones(self):
         return self.zones
@@ -35,14 +44,136 @@ class ZoneManager:
     def get_current_zone_points(self):
         return self.current_zone
 
+    def ensure_raster(self, width, height):
+        """Returns the label raster for a camera of width x height, compiling it if zones or size changed."""
+        key = (self.version, width, height)
+        if self._raster_key != key:
+            # Overlapping zones: the later zone wins the shared pixels
+            raster = np.zeros((height, width), dtype=np.uint16)
+            for i, zone in enumerate(self.zones):
+                cv2.fillPoly(raster, [zone], i + 1)
+            self._raster = raster
+            self._raster_key = key
+        return self._raster
+
+    def get_zone_mask(self, width, height):
+        """Binary mask (255 inside any zone) at camera resolution, cached with the raster."""
+        raster = self.ensure_raster(width, height)
+        if self._mask_key != self._raster_key:
+            self._mask = np.where(raster > 0, 255, 0).astype(np.uint8)
+            self._mask_key = self._raster_key
+        return self._mask
+
+    def get_zones_bbox(self):
+        """Bounding box (x, y, w, h) of all zones in camera space, or None if there are no zones."""
+        if not self.zones:
+            return None
+        return cv2.boundingRect(np.concatenate(self.zones))
+
+    def zone_at(self, point):
+        """Returns the zone id (index + 1) containing point, or 0."""
+        x, y = int(point[0]), int(point[1])
+        if self._raster is not None and self._raster_key[0] == self.version:
+            h, w = self._raster.shape
+            if 0 <= x < w and 0 <= y < h:
+                return int(self._raster[y, x])
+            return 0
+        # No compiled raster yet: fall back to polygon tests
+        for i, zone in enumerate(self.zones):
+            # pointPolygonTest returns > 0 if inside, 0 if on edge, < 0 if outside
+            if cv2.pointPolygonTest(zone, (x, y), False) >= 0:
+                return i + 1
+        return 0
+
+    def _current_raster(self, size):
+        """
+        Raster matching the current zones: for camera size (w, h) if given, else at the size of
+        the last ensure_raster() call (recompiled if the zones changed since). None if never sized.
+        """
+        if size is not None:
+            return self.ensure_raster(size[0], size[1])
+        if self._raster_key is None:
+            return None
+        return self.ensure_raster(self._raster_key[1], self._raster_key[2])
+
+    def zones_at(self, points, size=None):
+        """
+        Vectorized zone_at for an (N, 2) array of points. Returns (N,) zone ids.
+        size: camera (w, h); the raster is recompiled if it or the zones changed.
+        Without a size and a raster, falls back to polygon tests.
+        """
+        points = np.asarray(points).reshape(-1, 2)
+        if len(points) == 0:
+            return np.zeros(0, dtype=np.uint16)
+        raster = self._current_raster(size)
+        if raster is None:
+            return np.array([self.zone_at(p) for p in points], dtype=np.uint16)
+        h, w = raster.shape
+        xs = points[:, 0].astype(np.intp)
+        ys = points[:, 1].astype(np.intp)
+        inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        ids = np.zeros(len(points), dtype=np.uint16)
+        ids[inside] = raster[ys[inside], xs[inside]]
+        return ids
+
+    def blobs_zone_pixels(self, blobs, offset=(0, 0), size=None):
+        """
+        Pixels of each blob inside each zone of a Blobs result: (N, zones + 1) array where
+        [i, z] is the camera-pixel area of blob i inside zone z (column 0 is always 0).
+        Only each blob's box within the zones' bounding box is read.
+        Blob coordinates are in a frame whose origin is 'offset' in camera space; size as in zones_at().
+        """
+        n, nz = len(blobs), len(self.zones) + 1
+        counts = np.zeros((n, nz))
+        raster = self._current_raster(size)
+        if n == 0 or raster is None or blobs.labels is None:
+            return counts
+        # Label pixels whose centre (camera space) falls in the zones' bounding box (within the raster)
+        k = blobs.scale
+        c = (k - 1) // 2
+        rh, rw = raster.shape
+        bx, by, bw, bh = self.get_zones_bbox()
+        h, w = blobs.labels.shape
+        ox = offset[0] + blobs.origin[0] * k + c # Camera x of label column 0
+        oy = offset[1] + blobs.origin[1] * k + c
+        c0 = min(w, max(0, -(-(max(0, bx) - ox) // k)))
+        c1 = min(w, max(0, -(-(min(rw, bx + bw) - ox) // k)))
+        r0 = min(h, max(0, -(-(max(0, by) - oy) // k)))
+        r1 = min(h, max(0, -(-(min(rh, by + bh) - oy) // k)))
+        if r1 <= r0 or c1 <= c0:
+            return counts
+
+        # Per blob, only its own box within the zones' box (label coordinates)
+        boxes = blobs.bboxes // k
+        x0 = np.maximum(boxes[:, 0] - blobs.origin[0], c0)
+        y0 = np.maximum(boxes[:, 1] - blobs.origin[1], r0)
+        x1 = np.minimum(boxes[:, 0] + boxes[:, 2] - blobs.origin[0], c1)
+        y1 = np.minimum(boxes[:, 1] + boxes[:, 3] - blobs.origin[1], r1)
+        for i in np.nonzero((x1 > x0) & (y1 > y0))[0]:
+            mine = blobs.labels[y0[i]:y1[i], x0[i]:x1[i]] == blobs.ids[i]
+            zones = raster[oy + y0[i] * k:oy + y1[i] * k:k, ox + x0[i] * k:ox + x1[i] * k:k]
+            counts[i] = np.bincount(zones[mine], minlength=nz)
+        counts[:, 0] = 0
+        counts *= k * k
+        return counts
+
+    def blobs_zone_overlap(self, blobs, offset=(0, 0), size=None):
+        """
+        Zone overlap of a Blobs result: (N, zones + 1) array where [i, z]
+        is the fraction of blob i's pixels inside zone z (column 0 = outside every zone).
+        Blob coordinates are in a frame whose origin is 'offset' in camera space; size as in zones_at().
+        """
+        overlap = self.blobs_zone_pixels(blobs, offset, size)
+        if len(blobs) == 0:
+            return overlap
+        overlap /= np.maximum(blobs.areas, 1)[:, None]
+        overlap[:, 0] = 1.0 - overlap[:, 1:].sum(axis=1)
+        return overlap
+
     def check_intersection(self, point):
         """Checks if a point is inside any prohibited zone."""
         # point is (x, y)
-        for zone in self.zones:
-            # pointPolygonTest returns > 0 if inside, 0 if on edge, < 0 if outside
-            if cv2.pointPolygonTest(zone, point, False) >= 0:
-                return True
-        return False
+        return self.zone_at(point) > 0
 
     def save_zones(self, filename="zones.json"):
         # Convert numpy arrays to lists for JSON serialization
@@ -54,6 +185,11 @@ class ZoneManager:
         except Exception as e:
             print(f"[ERROR] Could not save zones: {e}")
 
+    def set_zones(self, zones):
+        """Replaces all zones (lists or arrays of points)."""
+        self.zones = [np.array(z, dtype=np.int32) for z in zones]
+        self.version += 1
+
     def load_zones(self, filename="zones.json"):
         if not os.path.exists(filename):
             print("[INFO] No zone file found.")
@@ -61,7 +197,7 @@ class ZoneManager:
         try:
             with open(filename, 'r') as f:
                 loaded_zones = json.load(f)
-            self.zones = [np.array(z, dtype=np.int32) for z in loaded_zones]
+            self.set_zones(loaded_zones)
             print(f"[INFO] Loaded {len(self.zones)} zones from {filename}")
         except Exception as e:
             print(f"[ERROR] Could not load zones: {e}")